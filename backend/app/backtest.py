@@ -0,0 +1,237 @@
+# File: backend/app/backtest.py
+
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .market_data import MarketDataStore
+from .oms import OrderManager
+from .parquet_io import trading_days
+from .simulation import TickSynthesizer, derive_seed
+
+BACKTEST_TICKS_PER_CANDLE = 60
+BACKTEST_BATCH_TICKS = 60  # Ticks per strategy callback (one candle)
+
+
+class BacktestContext:
+    """
+    What a strategy sees on every batch.
+
+    Attributes:
+        oms: This day's OrderManager (place resting orders, read positions)
+        date, symbol: Trading day and instrument
+        epochs, prices: The current tick batch
+        pnl: Unrealized PnL at each tick of the batch
+        fills: Resting orders filled during the batch
+        state: Dict the strategy may use to keep state across batches of a day
+    """
+
+    def __init__(self, oms, date, symbol):
+        self.oms = oms
+        self.date = date
+        self.symbol = symbol
+        self.epochs = None
+        self.prices = None
+        self.pnl = None
+        self.fills = []
+        self.state = {}
+
+    @property
+    def price(self) -> float:
+        return float(self.prices[-1])
+
+    @property
+    def position(self) -> int:
+        return self.oms.position
+
+    def buy(self, qty, **kwargs):
+        """
+        Market BUY at the last tick of the batch.
+        """
+        return self.oms.buy(self.price, qty, when=float(self.epochs[-1]), **kwargs)
+
+    def sell(self, qty, **kwargs):
+        """
+        Market SELL at the last tick of the batch.
+        """
+        return self.oms.sell(self.price, qty, when=float(self.epochs[-1]), **kwargs)
+
+
+class _TradeCollector:
+    """
+    Journal stand-in: backtest trades are returned, not written to Postgres.
+    """
+
+    def __init__(self):
+        self.trades = []
+
+    def record(self, trade):
+        self.trades.append(trade)
+
+
+def load_strategy(strategy):
+    """
+    Resolve a strategy given as a callable or a "package.module:function" path.
+    """
+    if callable(strategy):
+        return strategy
+    module_name, _, attr = str(strategy).partition(":")
+    if not attr:
+        raise ValueError(f"Strategy must look like 'package.module:function', got {strategy!r}")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def run_day(file_path, symbol, date, strategy, seed_key="backtest",
+            batch_ticks=BACKTEST_BATCH_TICKS, flatten_eod=True) -> dict:
+    """
+    Backtest one trading day as fast as the CPU allows.
+
+    The day's ticks come from a synthesizer seeded by (seed_key, symbol,
+    date), so a day yields the same ticks whichever worker runs it.
+
+    Args:
+        file_path: Parquet file with the minute candles
+        symbol: Instrument symbol
+        date: Trading day ("2024-01-15")
+        strategy: Callable or "module:function", called as strategy(ctx)
+            after every batch
+        seed_key: Seeds the synthesizer together with symbol and date
+        batch_ticks: Ticks per strategy callback
+        flatten_eod: Close any open position at the last tick of the day
+
+    Returns:
+        Dict with date, trades (TradeLog dicts), equity_epochs and equity
+        (realized + unrealized PnL at the end of every batch)
+    """
+    # Each day is read once, so it bypasses the shared store registry
+    day = pd.Timestamp(date).normalize()
+    store = MarketDataStore.from_parquet(file_path, symbol, start=day, end=day + pd.Timedelta(days=1))
+    day = store.day(date)
+    if day is None:
+        raise LookupError(f"No data found for date: {date}")
+
+    strategy = load_strategy(strategy)
+    seed = derive_seed(seed_key, symbol, day.date)
+    ticks = TickSynthesizer(seed).generate_day(
+        day.open, day.high, day.low, day.close, num_ticks=BACKTEST_TICKS_PER_CANDLE
+    ).reshape(-1)
+    candle_epochs = (day.timestamps - np.datetime64(0, "s")) / np.timedelta64(1, "s")
+    epochs = np.repeat(candle_epochs, BACKTEST_TICKS_PER_CANDLE) + np.tile(
+        np.arange(BACKTEST_TICKS_PER_CANDLE, dtype=np.float64), len(day)
+    )
+
+    collector = _TradeCollector()
+    oms = OrderManager(symbol, journal=collector, verbose=False)
+    oms.session_id = f"{seed_key}:{day.date}"
+    ctx = BacktestContext(oms, day.date, symbol)
+
+    ends = np.arange(batch_ticks, len(ticks) + batch_ticks, batch_ticks).clip(max=len(ticks))
+    equity = np.empty(len(ends))
+    start = 0
+    for i, end in enumerate(ends.tolist()):
+        ctx.epochs, ctx.prices = epochs[start:end], ticks[start:end]
+        ctx.pnl, ctx.fills = oms.process_batch(ctx.prices, ctx.epochs)
+        strategy(ctx)
+        equity[i] = oms.realized_pnl + oms.calculate_pnl(ctx.price)
+        start = end
+
+    if flatten_eod and oms.is_in_position:
+        close = oms.sell if oms.position > 0 else oms.buy
+        close(float(ticks[-1]), oms.quantity, when=float(epochs[-1]), exit_reason="end_of_day")
+        equity[-1] = oms.realized_pnl
+
+    return {
+        "date": day.date,
+        "trades": collector.trades,
+        "equity_epochs": epochs[ends - 1],
+        "equity": equity,
+    }
+
+
+def _run_day(task):
+    return run_day(*task)
+
+
+class BacktestResult:
+    """
+    Merged output of a backtest: one trade log and one equity curve.
+    """
+
+    def __init__(self, days, elapsed):
+        self.days = days
+        self.elapsed = elapsed
+
+        # Trades in time order, numbered across the whole run
+        trades = pd.DataFrame([trade for day in days for trade in day["trades"]])
+        if len(trades):
+            trades = trades.sort_values("exit_time", kind="stable").reset_index(drop=True)
+            trades["trade_number"] = np.arange(1, len(trades) + 1)
+        self.trades = trades
+
+        # Each day starts from the equity the previous days ended with
+        offsets = np.cumsum([0.0] + [day["equity"][-1] for day in days[:-1]])
+        self.equity = pd.DataFrame({
+            "timestamp": pd.to_datetime(np.concatenate([day["equity_epochs"] for day in days]), unit="s"),
+            "equity": np.concatenate([day["equity"] + offset for day, offset in zip(days, offsets)]),
+        })
+
+    def summary(self) -> dict:
+        equity = self.equity["equity"].to_numpy()
+        drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity
+        pnl = self.trades["pnl"].to_numpy() if len(self.trades) else np.empty(0)
+        return {
+            "days": len(self.days),
+            "trades": len(pnl),
+            "total_pnl": round(float(equity[-1]), 2) if len(equity) else 0.0,
+            "win_rate": round(float((pnl > 0).mean()), 4) if len(pnl) else 0.0,
+            "max_drawdown": round(float(drawdown.max()), 2) if len(drawdown) else 0.0,
+            "elapsed_seconds": round(self.elapsed, 2),
+        }
+
+
+def run_backtest(strategy, start=None, end=None, file_path="data/NIFTY_50_1min.parquet",
+                 symbol="NIFTY 50", seed_key="backtest", workers=None,
+                 batch_ticks=BACKTEST_BATCH_TICKS, flatten_eod=True) -> BacktestResult:
+    """
+    Backtest a strategy over a date range, sharding trading days across processes.
+
+    Every worker loads only the days it runs (one window per day) and runs
+    them whole, each with its own seeded synthesizer and OrderManager, so
+    the result does not depend on the number of workers. Positions are
+    intraday: with flatten_eod they are closed at the end of each day.
+
+    Args:
+        strategy: A module-level callable or "package.module:function"
+            (it must be importable by the worker processes)
+        start, end: Inclusive date range; defaults to the whole file
+        workers: Process count; 1 runs in-process, None uses every CPU
+
+    Raises:
+        LookupError: If the file is missing or has no days in the range
+    """
+    if not os.path.exists(file_path):
+        raise LookupError(f"Market data not found: {file_path}")
+
+    # Only the date column is scanned here; each worker loads just its own days
+    days = trading_days(file_path, start, end)
+    if not len(days):
+        raise LookupError(f"No trading days between {start} and {end}")
+
+    tasks = [(file_path, symbol, str(day), strategy, seed_key, batch_ticks, flatten_eod) for day in days]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_run_day(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            results = list(pool.map(_run_day, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    print(f"🧪 Backtest: {len(tasks)} days on {workers} workers in {elapsed:.2f}s")
+    return BacktestResult(results, elapsed)
@@ -0,0 +1,424 @@
+# File: backend/app/bus.py
+#
+# Cross-worker session registry and message bus on Redis, so the backend
+# can run as `uvicorn main:app --workers N` on one or more boxes:
+#
+#   - session:<id>        hash of session metadata and its owner worker (TTL,
+#                         renewed by the owner's heartbeat)
+#   - token:<token>       session id currently holding a resume token
+#   - worker:<id>         liveness key of each backend worker
+#   - room:<id>           room settings; room:<id>:owner is the one worker
+#                         producing its frames, room:<id>:members every
+#                         subscribed session on any worker (all renewed by
+#                         the owner's heartbeat, deleted when the room closes)
+#   - room:<id>:frames    pub/sub channel carrying the room's tick frames
+#   - tradeshift:broadcast pub/sub channel for admin messages to every session
+#   - tradeshift:takeover pub/sub channel asking a worker to end the live
+#                         session holding a token (a reconnect resumes it)
+#
+# Without Redis the bus disables itself and everything stays process-local.
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import time
+import uuid
+
+import numpy as np
+
+REDIS_HOST = os.getenv("REDIS_HOST", "tradeshift_redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+BUS_ENABLED = os.getenv("BUS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+SESSION_TTL = int(os.getenv("SESSION_TTL", "60"))
+HEARTBEAT_SECONDS = 10.0
+ROOM_OWNER_TTL = 30  # A room whose owner stops renewing is taken over by another worker
+ROOM_STATE_TTL = 4 * ROOM_OWNER_TTL  # Settings and members outlive the owner key until a takeover
+
+BROADCAST_CHANNEL = "tradeshift:broadcast"
+TAKEOVER_CHANNEL = "tradeshift:takeover"
+TAKEOVER_TIMEOUT = 2.0  # Max seconds a reconnect waits for the old session to park
+
+# Frame: symbol length (uint16), tick count (uint32), symbol, float64 epochs, float64 prices
+_FRAME_HEADER = struct.Struct("<HI")
+
+
+def session_key(session_id) -> str:
+    return f"session:{session_id}"
+
+
+def token_key(token) -> str:
+    return f"token:{token}"
+
+
+def room_key(room_id) -> str:
+    return f"room:{room_id}"
+
+
+def encode_frame(symbol, epochs, prices) -> bytes:
+    """
+    Pack a room frame for pub/sub (lossless, unlike the client wire format).
+    """
+    symbol_bytes = symbol.encode("utf-8")
+    return b"".join((
+        _FRAME_HEADER.pack(len(symbol_bytes), len(prices)),
+        symbol_bytes,
+        np.asarray(epochs, dtype="<f8").tobytes(),
+        np.asarray(prices, dtype="<f8").tobytes(),
+    ))
+
+
+def decode_frame(payload: bytes):
+    """
+    Returns:
+        (symbol, epochs, prices)
+    """
+    symbol_len, n = _FRAME_HEADER.unpack_from(payload)
+    offset = _FRAME_HEADER.size
+    symbol = payload[offset:offset + symbol_len].decode("utf-8")
+    offset += symbol_len
+    epochs = np.frombuffer(payload, dtype="<f8", count=n, offset=offset)
+    prices = np.frombuffer(payload, dtype="<f8", count=n, offset=offset + 8 * n)
+    return symbol, epochs, prices
+
+
+class MessageBus:
+    """
+    This worker's view of the cluster: its local sessions, the Redis
+    registry and the pub/sub subscriptions for broadcasts and remote rooms.
+
+    Every method is safe to call when the bus is disabled (Redis missing):
+    registry writes become no-ops, room claims always succeed and
+    broadcasts are delivered locally.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.enabled = False
+        self.sessions = {}  # session_id -> TickerSession on this worker
+        self.owned_rooms = set()
+        self._pubsub = None
+        self._room_handlers = {}
+        self._tasks = set()
+
+    # =========================
+    # Lifecycle
+    # =========================
+    async def start(self):
+        if not BUS_ENABLED:
+            return
+        try:
+            if self.redis is None:
+                from redis.asyncio import Redis
+                self.redis = Redis(host=REDIS_HOST, port=REDIS_PORT, socket_connect_timeout=2, socket_timeout=5)
+            await self.redis.ping()
+        except Exception as e:
+            print(f"⚠️ Message bus disabled (Redis unavailable): {e}")
+            return
+
+        self.enabled = True
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(**{BROADCAST_CHANNEL: self._on_broadcast, TAKEOVER_CHANNEL: self._on_takeover})
+        self.background(self._listen())
+        self.background(self._heartbeat())
+        print(f"🛰️ Message bus up: worker {WORKER_ID}")
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self.enabled:
+            try:
+                await self.redis.delete(f"worker:{WORKER_ID}", *[session_key(s) for s in self.sessions])
+                for room_id in list(self.owned_rooms):
+                    await self.release_room(room_id)
+                await self._pubsub.aclose()
+                await self.redis.aclose()
+            except Exception as e:
+                print(f"⚠️ Message bus shutdown: {e}")
+        self.enabled = False
+
+    def background(self, coro):
+        """
+        Run a coroutine as a tracked task (callable from sync code on the loop).
+        """
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _listen(self):
+        # Handlers registered with subscribe() are invoked by get_message()
+        while True:
+            try:
+                await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Message bus listener: {e}")
+                await asyncio.sleep(1.0)
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.set(f"worker:{WORKER_ID}", json.dumps({"sessions": len(self.sessions)}), ex=SESSION_TTL)
+                for session_id, session in self.sessions.items():
+                    pipe.expire(session_key(session_id), SESSION_TTL)
+                    if session.started:
+                        pipe.expire(token_key(session.token), SESSION_TTL)
+                for room_id in self.owned_rooms:
+                    key = room_key(room_id)
+                    pipe.expire(f"{key}:owner", ROOM_OWNER_TTL)
+                    pipe.expire(key, ROOM_STATE_TTL)
+                    pipe.expire(f"{key}:members", ROOM_STATE_TTL)
+                await pipe.execute()
+            except Exception as e:
+                print(f"⚠️ Message bus heartbeat: {e}")
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+    # =========================
+    # Session registry
+    # =========================
+    async def register_session(self, session, **fields):
+        self.sessions[session.session_id] = session
+        await self.update_session(session, worker=WORKER_ID, connected_at=time.time(), **fields)
+
+    async def update_session(self, session, **fields):
+        if not self.enabled:
+            return
+        key = session_key(session.session_id)
+        mapping = {name: "" if value is None else str(value) for name, value in fields.items()}
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, SESSION_TTL)
+            await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ Session registry write failed: {e}")
+
+    async def unregister_session(self, session):
+        self.sessions.pop(session.session_id, None)
+        if not self.enabled:
+            return
+        try:
+            await self.redis.delete(session_key(session.session_id))
+            key = token_key(session.token)
+            if _decode(await self.redis.get(key)) == session.session_id:
+                await self.redis.delete(key)
+        except Exception as e:
+            print(f"⚠️ Session registry delete failed: {e}")
+
+    async def register_token(self, session):
+        """
+        Record that this session now holds its resume token.
+        """
+        if self.enabled:
+            await self._safe(self.redis.set(token_key(session.token), session.session_id, ex=SESSION_TTL))
+
+    async def end_session(self, token, requester) -> bool:
+        """
+        End the live session holding a resume token, on whichever worker it
+        runs, and wait until it has parked its state (see TickerSession.end).
+
+        A fast reconnect can arrive before the old socket is seen to drop;
+        without this both connections would trade under one token.
+
+        Returns:
+            True if a live session was ended
+        """
+        for session in list(self.sessions.values()):
+            if session is not requester and session.started and session.token == token:
+                await session.end()
+                return True
+        if not self.enabled:
+            return False
+
+        try:
+            if await self.redis.get(token_key(token)) is None:
+                return False
+            await self.redis.publish(TAKEOVER_CHANNEL, json.dumps({"token": token, "by": requester.session_id}))
+            deadline = time.monotonic() + TAKEOVER_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+                if await self.redis.get(token_key(token)) is None:
+                    return True
+        except Exception as e:
+            print(f"⚠️ Session takeover failed: {e}")
+            return False
+        print(f"⚠️ Session holding {token[:6]}... did not release it in {TAKEOVER_TIMEOUT}s")
+        return False
+
+    def _on_takeover(self, message):
+        request = json.loads(message["data"])
+        for session in list(self.sessions.values()):
+            if session.started and session.token == request["token"] and session.session_id != request["by"]:
+                self.background(session.end())
+
+    async def list_sessions(self) -> list:
+        """
+        Metadata of every registered session in the cluster.
+        """
+        if not self.enabled:
+            return [{"session_id": session_id, "worker": WORKER_ID} for session_id in self.sessions]
+        sessions = []
+        async for key in self.redis.scan_iter(match=session_key("*"), count=500):
+            data = await self.redis.hgetall(key)
+            key = key.decode() if isinstance(key, bytes) else key
+            sessions.append({"session_id": key.split(":", 1)[1], **_decode_hash(data)})
+        return sessions
+
+    # =========================
+    # Rooms
+    # =========================
+    async def claim_room(self, room_id, settings=None) -> bool:
+        """
+        Become the room's producer unless another live worker already is.
+        """
+        if not self.enabled:
+            return True
+        key = room_key(room_id)
+        try:
+            claimed = await self.redis.set(f"{key}:owner", WORKER_ID, nx=True, ex=ROOM_OWNER_TTL)
+            if claimed:
+                pipe = self.redis.pipeline(transaction=False)
+                if settings:
+                    pipe.hset(key, mapping={k: "" if v is None else str(v) for k, v in settings.items()})
+                pipe.expire(key, ROOM_STATE_TTL)
+                pipe.expire(f"{key}:members", ROOM_STATE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ Room claim failed, running {room_id} locally: {e}")
+            return True
+        if claimed:
+            self.owned_rooms.add(room_id)
+        return bool(claimed)
+
+    async def release_room(self, room_id, close=False):
+        """
+        Give up producing a room.
+
+        Args:
+            room_id: The room
+            close: The room has no members left: also delete its settings and
+                member set (otherwise they stay for the worker taking it over)
+        """
+        self.owned_rooms.discard(room_id)
+        if not self.enabled:
+            return
+        key = room_key(room_id)
+        try:
+            if _decode(await self.redis.get(f"{key}:owner")) == WORKER_ID:
+                await self.redis.delete(f"{key}:owner", *((key, f"{key}:members") if close else ()))
+        except Exception as e:
+            print(f"⚠️ Room release failed: {e}")
+
+    async def room_settings(self, room_id) -> dict:
+        if not self.enabled:
+            return {}
+        return _decode_hash(await self.redis.hgetall(room_key(room_id)))
+
+    async def room_owner(self, room_id):
+        if not self.enabled:
+            return WORKER_ID
+        return _decode(await self.redis.get(f"{room_key(room_id)}:owner"))
+
+    async def add_member(self, room_id, session_id):
+        if self.enabled:
+            key = f"{room_key(room_id)}:members"
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.sadd(key, session_id)
+            pipe.expire(key, ROOM_STATE_TTL)
+            await self._safe(pipe.execute())
+
+    async def remove_member(self, room_id, session_id):
+        if self.enabled:
+            await self._safe(self.redis.srem(f"{room_key(room_id)}:members", session_id))
+
+    async def member_count(self, room_id) -> int:
+        """
+        Live members of a room on any worker (members whose session expired
+        with a dead worker are pruned).
+        """
+        if not self.enabled:
+            return 0
+        key = f"{room_key(room_id)}:members"
+        try:
+            members = [_decode(m) for m in await self.redis.smembers(key)]
+            if not members:
+                return 0
+            pipe = self.redis.pipeline(transaction=False)
+            for member in members:
+                pipe.exists(session_key(member))
+            alive = await pipe.execute()
+            stale = [member for member, exists in zip(members, alive) if not exists]
+            if stale:
+                await self.redis.srem(key, *stale)
+            return len(members) - len(stale)
+        except Exception as e:
+            print(f"⚠️ Room member count failed: {e}")
+            return 0
+
+    async def publish_frame(self, room_id, symbol, epochs, prices):
+        if self.enabled:
+            await self._safe(self.redis.publish(f"{room_key(room_id)}:frames", encode_frame(symbol, epochs, prices)))
+
+    async def subscribe_room(self, room_id, on_frame):
+        """
+        Deliver the room's frames to on_frame(symbol, epochs, prices).
+        """
+        channel = f"{room_key(room_id)}:frames"
+        self._room_handlers[channel] = on_frame
+        await self._pubsub.subscribe(**{channel: self._on_room_frame})
+
+    async def unsubscribe_room(self, room_id):
+        channel = f"{room_key(room_id)}:frames"
+        self._room_handlers.pop(channel, None)
+        if self.enabled:
+            await self._safe(self._pubsub.unsubscribe(channel))
+
+    def _on_room_frame(self, message):
+        handler = self._room_handlers.get(_decode(message["channel"]))
+        if handler is not None:
+            handler(*decode_frame(message["data"]))
+
+    # =========================
+    # Admin broadcast
+    # =========================
+    async def broadcast(self, payload: dict) -> int:
+        """
+        Send a BROADCAST message to every session on every worker.
+
+        Returns:
+            Number of workers that received it (1 when the bus is disabled)
+        """
+        data = json.dumps(payload)
+        if not self.enabled:
+            self._on_broadcast({"data": data})
+            return 1
+        return int(await self.redis.publish(BROADCAST_CHANNEL, data))
+
+    def _on_broadcast(self, message):
+        payload = json.loads(message["data"])
+        for session in list(self.sessions.values()):
+            session.outbound.put_message({"type": "BROADCAST", "data": payload})
+
+    async def _safe(self, awaitable):
+        try:
+            return await awaitable
+        except Exception as e:
+            print(f"⚠️ Message bus call failed: {e}")
+            return None
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _decode_hash(data) -> dict:
+    return {_decode(k): _decode(v) for k, v in (data or {}).items()}
+
+
+message_bus = MessageBus()
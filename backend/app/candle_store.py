@@ -0,0 +1,221 @@
+# File: backend/app/candle_store.py
+#
+# Optional TimescaleDB candle store. Minute bars live in a compressed
+# hypertable (candles_1m, loaded by scripts/load_candles.py) and coarser
+# timeframes are continuous aggregates over it, so chart history at any
+# zoom level is an indexed range query instead of a pandas resample.
+
+import io
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from sqlalchemy import text
+
+from .catalog import catalog_key, interval_seconds
+from .database import async_engine
+from .parquet_io import normalize_candles
+
+CANDLE_TABLE = "candles_1m"
+CANDLE_CHUNK_INTERVAL = "7 days"
+CANDLE_COMPRESS_AFTER = "30 days"
+CANDLE_REFRESH_WINDOW = "7 days"  # Policies re-materialize this much recent history
+CANDLE_MAX_LIMIT = 5000
+
+# Continuous aggregates: view name -> bucket width
+CANDLE_AGGREGATES = {
+    "candles_5m": "5 minutes",
+    "candles_15m": "15 minutes",
+    "candles_1h": "1 hour",
+    "candles_1d": "1 day",
+}
+
+# Relation serving each candle length in seconds
+_VIEWS = {60: CANDLE_TABLE, 300: "candles_5m", 900: "candles_15m", 3600: "candles_1h", 86400: "candles_1d"}
+
+_COPY_COLUMNS = ("symbol", "time", "open", "high", "low", "close", "volume")
+
+
+def schema_statements() -> list:
+    """
+    Idempotent DDL for the hypertable, its compression and the aggregates.
+
+    Aggregates are created WITH NO DATA (allowed inside a transaction); their
+    policies keep the last CANDLE_REFRESH_WINDOW current, and backfills are
+    materialized by refresh_aggregates().
+    """
+    statements = [
+        f"""
+        CREATE TABLE IF NOT EXISTS {CANDLE_TABLE} (
+            symbol VARCHAR(50) NOT NULL,
+            time TIMESTAMP NOT NULL,
+            open DOUBLE PRECISION NOT NULL,
+            high DOUBLE PRECISION NOT NULL,
+            low DOUBLE PRECISION NOT NULL,
+            close DOUBLE PRECISION NOT NULL,
+            volume BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (symbol, time)
+        )
+        """,
+        f"""
+        SELECT create_hypertable('{CANDLE_TABLE}', 'time',
+            chunk_time_interval => INTERVAL '{CANDLE_CHUNK_INTERVAL}', if_not_exists => TRUE)
+        """,
+        # Compression settings cannot be re-applied once chunks are compressed
+        f"""
+        DO $$
+        BEGIN
+            IF NOT (SELECT compression_enabled FROM timescaledb_information.hypertables
+                    WHERE hypertable_name = '{CANDLE_TABLE}') THEN
+                ALTER TABLE {CANDLE_TABLE} SET (
+                    timescaledb.compress,
+                    timescaledb.compress_segmentby = 'symbol',
+                    timescaledb.compress_orderby = 'time'
+                );
+            END IF;
+        END
+        $$
+        """,
+        f"SELECT add_compression_policy('{CANDLE_TABLE}', INTERVAL '{CANDLE_COMPRESS_AFTER}', if_not_exists => TRUE)",
+    ]
+    for view, width in CANDLE_AGGREGATES.items():
+        statements += [
+            f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+            WITH (timescaledb.continuous) AS
+            SELECT symbol,
+                   time_bucket(INTERVAL '{width}', time) AS time,
+                   first(open, time) AS open,
+                   max(high) AS high,
+                   min(low) AS low,
+                   last(close, time) AS close,
+                   sum(volume)::BIGINT AS volume
+            FROM {CANDLE_TABLE}
+            GROUP BY symbol, time_bucket(INTERVAL '{width}', time)
+            WITH NO DATA
+            """,
+            f"""
+            SELECT add_continuous_aggregate_policy('{view}',
+                start_offset => INTERVAL '{CANDLE_REFRESH_WINDOW}', end_offset => INTERVAL '{width}',
+                schedule_interval => INTERVAL '1 hour', if_not_exists => TRUE)
+            """,
+        ]
+    return statements
+
+
+def ensure_schema(db_engine):
+    """
+    Create the candle hypertable and aggregates if they do not exist.
+    """
+    with db_engine.begin() as conn:
+        for statement in schema_statements():
+            conn.execute(text(statement))
+
+
+def copy_candles(db_engine, symbol, table) -> int:
+    """
+    Bulk load one batch of minute bars with COPY (upserting on conflicts).
+
+    Rows are COPYed into a temporary staging table and merged with one
+    INSERT ... ON CONFLICT, so re-loading a file updates bars in place.
+
+    Args:
+        db_engine: Sync (psycopg2) engine
+        symbol: Instrument symbol (stored in catalog spelling)
+        table: Candle table or record batch in any source layout
+
+    Returns:
+        Number of rows loaded
+    """
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    candles = normalize_candles(table)
+    if not candles.num_rows:
+        return 0
+    if "volume" not in candles.column_names:
+        candles = candles.append_column("volume", pa.array([0] * candles.num_rows, type=pa.int64()))
+
+    rows = pa.table({
+        "symbol": pa.array([catalog_key(symbol)] * candles.num_rows, type=pa.string()),
+        "time": candles.column("date").cast(pa.timestamp("us")),
+        **{name: candles.column(name) for name in _COPY_COLUMNS[2:]},
+    })
+    buffer = io.BytesIO()
+    pacsv.write_csv(rows, buffer, pacsv.WriteOptions(include_header=False))
+    buffer.seek(0)
+
+    columns = ", ".join(_COPY_COLUMNS)
+    raw = db_engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE candles_staging (LIKE {CANDLE_TABLE}) ON COMMIT DROP")
+            cursor.copy_expert(f"COPY candles_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(f"""
+                INSERT INTO {CANDLE_TABLE} ({columns})
+                SELECT {columns} FROM candles_staging
+                ON CONFLICT (symbol, time) DO UPDATE SET
+                    open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                    close = EXCLUDED.close, volume = EXCLUDED.volume
+            """)
+        raw.commit()
+    finally:
+        raw.close()
+    return candles.num_rows
+
+
+def refresh_aggregates(db_engine, start=None, end=None):
+    """
+    Materialize every aggregate over [start, end] (whole history if None).
+
+    refresh_continuous_aggregate cannot run in a transaction, hence AUTOCOMMIT.
+    """
+    with db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for view in CANDLE_AGGREGATES:
+            conn.execute(
+                text(f"CALL refresh_continuous_aggregate('{view}', CAST(:start AS TIMESTAMP), CAST(:end AS TIMESTAMP))"),
+                {"start": start, "end": end},
+            )
+
+
+def candle_view(interval) -> str:
+    """
+    Hypertable or aggregate serving an interval ("15min" -> candles_15m).
+
+    Raises:
+        ValueError: If the interval is unknown or has no aggregate
+    """
+    view = _VIEWS.get(interval_seconds(interval))
+    if view is None:
+        raise ValueError(f"No candle aggregate for interval: {interval}")
+    return view
+
+
+async def fetch_candles(symbol, interval="5m", start=None, end=None, limit=1000) -> list:
+    """
+    The latest `limit` candles of (symbol, interval) in [start, end), oldest first.
+
+    Raises:
+        ValueError: On an unsupported interval
+    """
+    view = candle_view(interval)
+    limit = max(1, min(int(limit), CANDLE_MAX_LIMIT))
+    clauses = ["symbol = :symbol"]
+    params = {"symbol": catalog_key(symbol), "limit": limit}
+    if start is not None:
+        clauses.append("time >= :start")
+        params["start"] = start
+    if end is not None:
+        clauses.append("time < :end")
+        params["end"] = end
+
+    # Served by the (symbol, time) index of the hypertable or aggregate
+    query = text(f"""
+        SELECT time, open, high, low, close, volume
+        FROM {view}
+        WHERE {" AND ".join(clauses)}
+        ORDER BY time DESC
+        LIMIT :limit
+    """)
+    async with async_engine.connect() as conn:
+        result = await conn.execute(query, params)
+        rows = result.mappings().all()
+    return [dict(row) for row in reversed(rows)]
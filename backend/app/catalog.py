@@ -0,0 +1,380 @@
+# File: backend/app/catalog.py
+
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from .database import engine
+from .market_data import get_market_data_store
+from .metrics import DATASET_CACHE_BYTES, DATASET_CACHE_REQUESTS
+from .parquet_io import footer_stats, trading_days
+
+DEFAULT_SYMBOL = os.getenv("DEFAULT_SYMBOL", "NIFTY 50")
+DEFAULT_INTERVAL = os.getenv("DEFAULT_INTERVAL", "1min")
+
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", "300"))
+CATALOG_MISS_REFRESH = 5.0  # Min seconds between refreshes triggered by unknown symbols
+
+MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
+MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
+MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+MINIO_BUCKET = os.getenv("MINIO_BUCKET", "market-data")
+
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "data/cache")
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+LOCAL_DATA_DIR = os.getenv("LOCAL_DATA_DIR", "data")
+
+_INTERVAL_UNITS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+
+def catalog_key(symbol) -> str:
+    """
+    Normalize a symbol to the catalog's spelling ("NIFTY 50" -> "NIFTY_50").
+    """
+    return re.sub(r"[\s\-]+", "_", str(symbol).strip().upper())
+
+
+def interval_seconds(interval) -> int:
+    """
+    Candle length in seconds ("1min" -> 60, "1h" -> 3600).
+
+    Raises:
+        ValueError: On an unrecognized interval
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([a-z]+)\s*", str(interval).lower())
+    if not match or match.group(2) not in _INTERVAL_UNITS:
+        raise ValueError(f"Unknown interval: {interval}")
+    return int(match.group(1)) * _INTERVAL_UNITS[match.group(2)]
+
+
+class DatasetEntry:
+    """
+    One Parquet object in MinIO covering [start, end] of (symbol, interval).
+    """
+
+    __slots__ = ("symbol", "interval", "start", "end", "bucket", "object_name", "rows", "version", "priority")
+
+    def __init__(self, symbol, interval, start, end, bucket, object_name, rows=None, version=None, priority=0):
+        self.symbol = symbol
+        self.interval = interval
+        self.start = pd.Timestamp(start) if start is not None else None
+        self.end = pd.Timestamp(end) if end is not None else None
+        self.bucket = bucket
+        self.object_name = object_name
+        self.rows = rows
+        self.version = version  # Changes whenever the object is re-uploaded
+        self.priority = priority
+
+    def covers(self, when) -> bool:
+        if self.start is None or self.end is None:
+            return False
+        day = pd.Timestamp(when).normalize()
+        return self.start.normalize() <= day <= self.end.normalize()
+
+    def local_name(self) -> str:
+        """
+        Path of this object version inside the disk cache.
+        """
+        root, ext = os.path.splitext(self.object_name)
+        suffix = f".{self.version}" if self.version else ""
+        return os.path.join(self.bucket, f"{root}{suffix}{ext}")
+
+
+class DataCatalog:
+    """
+    In-memory map of (symbol, interval) -> dataset entries.
+
+    Loaded from dataset_partitions (month partitions written by
+    scripts/upload_data.py), index_metadata (whole files uploaded by the same
+    script, exact date bounds) and simulation_metadata (written by
+    scripts/ingestor.py, one file per symbol and year). The map is refreshed
+    every CATALOG_TTL seconds, or sooner when an unknown symbol is requested.
+    """
+
+    def __init__(self, db_engine=None, ttl=CATALOG_TTL):
+        self.engine = db_engine or engine
+        self.ttl = ttl
+        self.entries = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        sources = (self._load_partitions(), self._load_index_metadata(), self._load_simulation_metadata())
+        if all(source is None for source in sources):
+            # Database unreachable: keep serving the last good catalog
+            self.loaded_at = time.monotonic()
+            return
+
+        entries = {}
+        for entry in (entry for source in sources for entry in source or []):
+            entries.setdefault((catalog_key(entry.symbol), entry.interval), []).append(entry)
+        for group in entries.values():
+            group.sort(key=lambda e: (e.priority, e.start or pd.Timestamp.min))
+
+        with self._lock:
+            self.entries = entries
+            self.loaded_at = time.monotonic()
+        print(f"🗂️ Catalog: {sum(len(g) for g in entries.values())} datasets for {len(entries)} symbol/intervals")
+
+    def _query(self, sql):
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(text(sql)).mappings().all()
+        except Exception as e:
+            print(f"⚠️ Catalog query failed: {e}")
+            return None
+
+    def _load_partitions(self):
+        rows = self._query("""
+            SELECT instrument, interval, start_date, end_date, rows_count,
+                   bucket_name, object_name, uploaded_at
+            FROM dataset_partitions
+        """)
+        return [
+            DatasetEntry(
+                row["instrument"], row["interval"], row["start_date"], row["end_date"],
+                row["bucket_name"], row["object_name"], rows=row["rows_count"],
+                version=_version(row["uploaded_at"]), priority=-1,
+            )
+            for row in rows
+        ] if rows is not None else None
+
+    def _load_index_metadata(self):
+        rows = self._query("""
+            SELECT instrument, interval, start_date, end_date, rows_count,
+                   bucket_name, object_name, uploaded_at
+            FROM index_metadata
+        """)
+        return [
+            DatasetEntry(
+                row["instrument"], row["interval"], row["start_date"], row["end_date"],
+                row["bucket_name"], row["object_name"], rows=row["rows_count"],
+                version=_version(row["uploaded_at"]), priority=0,
+            )
+            for row in rows
+        ] if rows is not None else None
+
+    def _load_simulation_metadata(self):
+        rows = self._query("SELECT symbol, year, file_path, created_at FROM simulation_metadata")
+        return [
+            DatasetEntry(
+                row["symbol"], _interval_from_path(row["file_path"]),
+                f"{row['year']}-01-01", f"{row['year']}-12-31",
+                MINIO_BUCKET, row["file_path"], version=_version(row["created_at"]), priority=1,
+            )
+            for row in rows
+        ] if rows is not None else None
+
+    def _ensure_fresh(self, missing=False):
+        age = None if self.loaded_at is None else time.monotonic() - self.loaded_at
+        if age is None or age > self.ttl or (missing and age > CATALOG_MISS_REFRESH):
+            self.refresh()
+
+    def resolve(self, symbol, interval=DEFAULT_INTERVAL, when=None) -> DatasetEntry | None:
+        """
+        The dataset for (symbol, interval) covering `when` (any date if None).
+
+        Month partitions win over whole-file index_metadata entries, which
+        win over per-year simulation_metadata ones; if no entry covers the
+        date, the best entry is returned and the store reports the missing date.
+        """
+        self._ensure_fresh()
+        key = (catalog_key(symbol), interval)
+        if key not in self.entries:
+            self._ensure_fresh(missing=True)
+        group = self.entries.get(key)
+        if not group:
+            return None
+        if when:
+            for entry in group:
+                if entry.covers(when):
+                    return entry
+        return group[0]
+
+    def following(self, symbol, interval, day) -> list:
+        """
+        The entries of (symbol, interval) that may hold data after `day`,
+        earliest start first (then by priority).
+        """
+        self._ensure_fresh()
+        day = pd.Timestamp(day).normalize()
+        group = self.entries.get((catalog_key(symbol), interval)) or []
+        return sorted(
+            (entry for entry in group if entry.end is None or entry.end.normalize() > day),
+            key=lambda e: (e.start or pd.Timestamp.min, e.priority),
+        )
+
+    def symbols(self) -> list:
+        self._ensure_fresh()
+        return sorted({symbol for symbol, _ in self.entries})
+
+
+class ParquetDiskCache:
+    """
+    Local on-disk cache of Parquet objects pulled from MinIO.
+
+    Objects are stored per version (see DatasetEntry.local_name), so a
+    re-upload is fetched fresh. Each hit touches the file's mtime; when the
+    cache grows past max_bytes the least recently used files are deleted.
+    """
+
+    def __init__(self, cache_dir=DATASET_CACHE_DIR, max_bytes=DATASET_CACHE_MAX_BYTES, minio_client=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._minio = minio_client
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+    @property
+    def minio(self):
+        if self._minio is None:
+            from minio import Minio
+            endpoint = MINIO_ENDPOINT.replace("http://", "").replace("https://", "")
+            self._minio = Minio(endpoint, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, secure=False)
+        return self._minio
+
+    def fetch(self, entry: DatasetEntry) -> str:
+        """
+        Local path of entry's Parquet, downloading it on a miss.
+
+        Raises:
+            Exception: Whatever the MinIO client raises on a failed download
+        """
+        path = os.path.join(self.cache_dir, entry.local_name())
+        with self._lock_for(path):
+            if os.path.exists(path):
+                os.utime(path)  # LRU: most recently used
+                DATASET_CACHE_REQUESTS.labels(result="hit").inc()
+                return path
+
+            DATASET_CACHE_REQUESTS.labels(result="miss").inc()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.part"
+            started = time.perf_counter()
+            self.minio.fget_object(entry.bucket, entry.object_name, partial)
+            os.replace(partial, path)
+            print(f"⬇️ Fetched {entry.bucket}/{entry.object_name} in {time.perf_counter() - started:.2f}s")
+
+        self.evict(keep=path)
+        return path
+
+    def _lock_for(self, path):
+        with self._locks_lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def evict(self, keep=None):
+        """
+        Delete least recently used files until the cache fits in max_bytes.
+        """
+        with self._evict_lock:
+            files = []
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    if name.endswith(".part"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    print(f"🧹 Dataset cache evicted {path}")
+                except FileNotFoundError:
+                    pass
+            DATASET_CACHE_BYTES.set(total)
+
+
+def _version(uploaded_at):
+    return None if uploaded_at is None else pd.Timestamp(uploaded_at).strftime("%Y%m%d%H%M%S")
+
+
+def _interval_from_path(path):
+    match = re.search(r"_(\d+(?:s|sec|m|min|h|hour|d|day))\.parquet$", path, re.IGNORECASE)
+    return match.group(1).lower() if match else DEFAULT_INTERVAL
+
+
+catalog = DataCatalog()
+dataset_cache = ParquetDiskCache()
+
+
+def open_market_data(symbol=DEFAULT_SYMBOL, interval=DEFAULT_INTERVAL, when=None):
+    """
+    Resolve (symbol, interval, date) to a shared MarketDataStore (blocking).
+
+    Looks the dataset up in the catalog and serves it from the local disk
+    cache, fetching it from MinIO when cold. Without a catalog entry (or if
+    MinIO is unreachable) it falls back to LOCAL_DATA_DIR/<SYMBOL>_<interval>.parquet.
+
+    Returns:
+        The store, or None if no data exists (callers fall back to synthetic data)
+    """
+    path = _dataset_path(symbol, interval, when)
+    if path is None:
+        return None
+
+    # Load only the requested trading day (the first one by default)
+    day = pd.Timestamp(when).normalize() if when else footer_stats(path)["start"].normalize()
+    return get_market_data_store(path, symbol, interval, start=day, end=day + pd.Timedelta(days=1))
+
+
+def next_trading_day(symbol, interval, day) -> str | None:
+    """
+    The first trading day of (symbol, interval) after `day` (blocking).
+
+    The day after `day` may fall in no dataset at all (the weekend after a
+    month partition's last trading day), so the catalog entries holding
+    later data are tried in date order until one has a later trading day.
+
+    Returns:
+        The date ("2024-01-16"), or None at the end of the data
+    """
+    start = pd.Timestamp(day).normalize() + pd.Timedelta(days=1)
+    entries = catalog.following(symbol, interval, day)
+    paths = (_entry_path(entry) for entry in entries)
+    if not entries:
+        paths = [_dataset_path(symbol, interval, start)]
+    for path in paths:
+        if path is None:
+            continue
+        days = trading_days(path, start=start)
+        if len(days):
+            return str(days[0])
+    return None
+
+
+def _dataset_path(symbol, interval, when):
+    """
+    Local path of the dataset covering `when`: the catalog entry from the
+    disk cache, else the LOCAL_DATA_DIR file (None if neither exists).
+    """
+    entry = catalog.resolve(symbol, interval, when)
+    path = _entry_path(entry) if entry is not None else None
+    if path is None:
+        path = os.path.join(LOCAL_DATA_DIR, f"{catalog_key(symbol)}_{interval}.parquet")
+    return path if os.path.exists(path) else None
+
+
+def _entry_path(entry):
+    """
+    Local path of a catalog entry (None if it cannot be fetched).
+    """
+    try:
+        return dataset_cache.fetch(entry)
+    except Exception as e:
+        print(f"⚠️ Dataset fetch failed for {entry.symbol} {entry.interval}: {e}")
+        return None
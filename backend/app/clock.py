@@ -0,0 +1,143 @@
+# File: backend/app/clock.py
+
+import math
+import time
+
+# One synthesized tick is one second of simulated market time
+SIM_SECONDS_PER_TICK = 1.0
+
+# Ticks per second at client "speed" 1 (the original pacing: 10-tick batches
+# every 0.1s), which the speed slider of the frontend still assumes
+LEGACY_TICKS_PER_SECOND = 100.0
+
+# Frame pacing: never more than ~20 frames/s, never more than this many ticks per frame
+MIN_FRAME_INTERVAL = 0.05
+MAX_FRAME_TICKS = 3000
+
+
+class SimulationClock:
+    """
+    Drift-free pacing for one replay.
+
+    Every deadline is computed from a fixed (wall time, tick) origin on the
+    monotonic clock, so time spent synthesizing or sending never accumulates
+    into drift. Frames are sized adaptively: at 1x a frame carries a single
+    tick every second, at 1000x the ticks due since the last frame are
+    coalesced into one frame every MIN_FRAME_INTERVAL.
+
+    A speed of None means "max speed": frames of MAX_FRAME_TICKS are released
+    as fast as the consumer accepts them.
+    """
+
+    def __init__(self, speed=1.0, seconds_per_tick=SIM_SECONDS_PER_TICK):
+        """
+        Args:
+            speed: Multiplier of real time, None for max speed
+            seconds_per_tick: Simulated seconds between ticks (longer
+                candle intervals spread their ticks further apart)
+        """
+        self.speed = speed
+        self.seconds_per_tick = seconds_per_tick
+        self.origin_time = time.monotonic()
+        self.origin_tick = 0
+        self.last_frame_time = None
+
+    @property
+    def is_max_speed(self) -> bool:
+        return self.speed is None
+
+    @staticmethod
+    def parse_speed(value):
+        """
+        Turn a client speed value into a multiplier, or None for max speed.
+
+        Accepts numbers or numeric strings; "max" and values <= 0 mean max speed.
+        """
+        if value is None:
+            return 1.0
+        if isinstance(value, str) and value.lower() == "max":
+            return None
+        speed = float(value)
+        if speed <= 0 or math.isinf(speed):
+            return None
+        return speed
+
+    @staticmethod
+    def requested_speed(message, seconds_per_tick=SIM_SECONDS_PER_TICK):
+        """
+        Clock speed asked for by a START/SPEED message.
+
+        "rate" is a multiple of real time (1 = one simulated second per
+        second). Without it, "speed" keeps its original meaning of
+        LEGACY_TICKS_PER_SECOND ticks per second per unit. Either accepts
+        "max" (see parse_speed).
+
+        Returns:
+            Multiple of real time, or None for max speed
+
+        Raises:
+            TypeError, ValueError: On a non-numeric value
+        """
+        if message.get("rate") is not None:
+            return SimulationClock.parse_speed(message["rate"])
+        speed = SimulationClock.parse_speed(message.get("speed", 1.0))
+        if speed is None:
+            return None
+        return speed * LEGACY_TICKS_PER_SECOND * seconds_per_tick
+
+    def reset(self, position=0):
+        """
+        Re-anchor the clock so that tick `position` is due right now.
+        """
+        self.origin_time = time.monotonic()
+        self.origin_tick = position
+        self.last_frame_time = None
+
+    def set_speed(self, speed, position):
+        """
+        Change speed mid-replay without jumping: the new rate applies from `position`.
+        """
+        self.speed = speed
+        self.reset(position)
+
+    def tick_time(self, position) -> float:
+        """
+        Monotonic time at which tick `position` is due.
+        """
+        ticks_per_second = self.speed / self.seconds_per_tick
+        return self.origin_time + (position - self.origin_tick) / ticks_per_second
+
+    def next_frame_time(self, position) -> float:
+        """
+        Monotonic time at which the frame starting at tick `position` should go out.
+        """
+        if self.is_max_speed:
+            return time.monotonic()
+        deadline = self.tick_time(position)
+        if self.last_frame_time is not None:
+            deadline = max(deadline, self.last_frame_time + MIN_FRAME_INTERVAL)
+        return deadline
+
+    def due(self, position, now=None) -> int:
+        """
+        Number of ticks from `position` that are due now (catch-up included).
+        """
+        if self.is_max_speed:
+            return MAX_FRAME_TICKS
+        now = time.monotonic() if now is None else now
+        elapsed_ticks = (now - self.origin_time) * self.speed / self.seconds_per_tick
+        due = self.origin_tick + int(elapsed_ticks) + 1 - position
+        return max(0, min(due, MAX_FRAME_TICKS))
+
+    def mark_frame(self, now=None):
+        self.last_frame_time = time.monotonic() if now is None else now
+
+    def actual_speed(self, position, now=None) -> float | None:
+        """
+        Achieved speed since the last reset, or None if too early to tell.
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self.origin_time
+        if elapsed < 1.0:
+            return None
+        return (position - self.origin_tick) * self.seconds_per_tick / elapsed
@@ -0,0 +1,81 @@
+# File: backend/app/database.py
+#
+# The one database layer for the backend, the OMS, the scripts and the
+# workers. Every engine is built here with the same pool configuration:
+#
+#   - engine / SessionLocal:           sync psycopg2, for threads and scripts
+#   - async_engine:                    asyncpg, for FastAPI request paths
+#
+# Engines connect lazily, so importing this module never touches the network.
+
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://user:password@db:5432/tradeshift")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+
+def _pool_options():
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def sync_url(url=DATABASE_URL):
+    """
+    The URL with the psycopg2 driver (non-PostgreSQL URLs pass through).
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+psycopg2")
+    return url
+
+
+def async_url(url=DATABASE_URL):
+    """
+    The URL with the asyncpg driver and its prepared statement cache.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg").update_query_dict(
+            {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+        )
+    return url
+
+
+def create_db_engine(url=DATABASE_URL, **overrides):
+    """
+    Sync engine with the shared pool settings (scripts, workers, threads).
+    """
+    options = _pool_options() if sync_url(url).get_backend_name() == "postgresql" else {}
+    options.update(overrides)
+    return create_engine(sync_url(url), **options)
+
+
+def create_async_db_engine(url=DATABASE_URL, **overrides):
+    """
+    Async (asyncpg) engine with the shared pool settings.
+    """
+    options = _pool_options() if async_url(url).get_backend_name() == "postgresql" else {}
+    options.update(overrides)
+    return create_async_engine(async_url(url), **options)
+
+
+# Process-wide engines and the sync session factory
+engine = create_db_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_db_engine()
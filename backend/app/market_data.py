@@ -0,0 +1,197 @@
+# File: backend/app/market_data.py
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .parquet_io import read_candle_arrays
+
+MARKET_DATA_MAX_STORES = int(os.getenv("MARKET_DATA_MAX_STORES", "32"))
+
+
+class DaySlice:
+    """
+    A read-only window over one trading day of a MarketDataStore.
+
+    All arrays are NumPy views into the shared store, so creating a slice
+    never copies candle data.
+    """
+
+    def __init__(self, store, start_row: int, end_row: int):
+        self.store = store
+        self.start_row = start_row
+        self.end_row = end_row
+
+        self.timestamps = store.timestamps[start_row:end_row]
+        self.open = store.open[start_row:end_row]
+        self.high = store.high[start_row:end_row]
+        self.low = store.low[start_row:end_row]
+        self.close = store.close[start_row:end_row]
+
+    def __len__(self):
+        return self.end_row - self.start_row
+
+    @property
+    def date(self) -> str:
+        return str(self.timestamps[0].astype("datetime64[D]"))
+
+
+class MarketDataStore:
+    """
+    Immutable, column-backed store of candles (1-minute unless stated).
+
+    The store is loaded once per process and shared by every WebSocket
+    session. Columns are kept as contiguous NumPy arrays (no per-row dicts)
+    and a per-trading-day offset index maps each date to its row range.
+    """
+
+    def __init__(self, timestamps, open_, high, low, close, symbol="NIFTY 50", interval="1min"):
+        """
+        Args:
+            timestamps: datetime64[ns] array sorted ascending
+            open_, high, low, close: float64 price arrays of the same length
+            symbol: Instrument symbol the candles belong to
+            interval: Candle interval ("1min", "5min", "1h", ...)
+        """
+        self.symbol = symbol
+        self.interval = interval
+        self.timestamps = timestamps
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+
+        for column in (self.timestamps, self.open, self.high, self.low, self.close):
+            column.flags.writeable = False
+
+        # Sorted trading-day index: day_keys[i] -> rows [day_starts[i], day_ends[i])
+        days = self.timestamps.astype("datetime64[D]")
+        self.day_keys, day_starts = np.unique(days, return_index=True)
+        self.day_starts = day_starts.astype(np.int64)
+        self.day_ends = np.append(self.day_starts[1:], len(days)).astype(np.int64)
+
+    @classmethod
+    def from_parquet(cls, file_path: str, symbol="NIFTY 50", interval="1min", start=None, end=None):
+        """
+        Load [start, end) of a Parquet file of candles into a store.
+
+        Only the date and OHLC columns of the row groups overlapping the
+        window are decoded (see app/parquet_io.py), so memory scales with
+        the window, not the file.
+
+        Raises:
+            ValueError: If the file has no 'date' or 'datetime' column
+        """
+        arrays = read_candle_arrays(file_path, start, end)
+        return cls(
+            arrays["timestamp"],
+            arrays["open"],
+            arrays["high"],
+            arrays["low"],
+            arrays["close"],
+            symbol=symbol,
+            interval=interval,
+        )
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def first_date(self) -> str:
+        return str(self.timestamps[0].astype("datetime64[D]"))
+
+    def seek(self, when) -> int:
+        """
+        Binary-search the first row at or after a timestamp.
+
+        Args:
+            when: Anything pandas can parse as a timestamp
+
+        Returns:
+            Row index in [0, len(store)]
+        """
+        return int(np.searchsorted(self.timestamps, _to_datetime64(when), side="left"))
+
+    def window(self, when) -> DaySlice | None:
+        """
+        Return a zero-copy slice from a timestamp to the end of its trading day.
+
+        A bare date (e.g. "2024-01-15") starts at the first candle of the day,
+        an intraday time (e.g. "2024-01-15T11:30") at the first candle at or
+        after it. Both lookups are binary searches over precomputed indexes,
+        so the cost does not grow with the size of the dataset.
+
+        Returns:
+            The slice, or None if the day is missing or already closed
+        """
+        ts = _to_datetime64(when)
+        day_index = int(np.searchsorted(self.day_keys, ts.astype("datetime64[D]")))
+        if day_index == len(self.day_keys) or self.day_keys[day_index] != ts.astype("datetime64[D]"):
+            return None
+
+        start_row = int(self.day_starts[day_index])
+        end_row = int(self.day_ends[day_index])
+        row = max(start_row, self.seek(ts))
+        if row >= end_row:
+            return None
+        return DaySlice(self, row, end_row)
+
+    def day(self, date) -> DaySlice | None:
+        """
+        Return a zero-copy slice for one whole trading day, or None if absent.
+
+        Args:
+            date: Anything pandas can parse as a date (e.g. "2024-01-15")
+        """
+        return self.window(pd.Timestamp(date).normalize())
+
+
+def _to_datetime64(when) -> np.datetime64:
+    ts = pd.Timestamp(when)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return np.datetime64(ts.value, "ns")
+
+
+# =========================
+# Process-wide store registry
+# =========================
+_stores = OrderedDict()
+_stores_lock = threading.Lock()
+
+
+def get_market_data_store(file_path: str, symbol="NIFTY 50", interval="1min",
+                          start=None, end=None) -> MarketDataStore | None:
+    """
+    Return the shared store for [start, end) of a Parquet file, loading it on first use.
+
+    Stores are kept per (file, window) in an LRU of MARKET_DATA_MAX_STORES
+    entries; sessions holding an evicted store keep using it.
+
+    Returns None when the file does not exist so callers can fall back to
+    synthetic data.
+    """
+    key = (file_path, _window_key(start), _window_key(end))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is not None:
+            _stores.move_to_end(key)
+            return store
+
+        if not os.path.exists(file_path):
+            return None
+        store = MarketDataStore.from_parquet(file_path, symbol=symbol, interval=interval, start=start, end=end)
+        _stores[key] = store
+        while len(_stores) > MARKET_DATA_MAX_STORES:
+            _stores.popitem(last=False)
+
+    window = "" if start is None and end is None else f" [{key[1]} .. {key[2]})"
+    print(f"📂 Loaded: {file_path}{window} ({len(store)} rows, shared)")
+    return store
+
+
+def _window_key(when):
+    return None if when is None else str(pd.Timestamp(when))
@@ -0,0 +1,221 @@
+# File: backend/app/matching.py
+
+import itertools
+
+import numpy as np
+
+LIMIT = "LIMIT"
+STOP = "STOP"
+ORDER_TYPES = (LIMIT, STOP)
+
+# Trigger direction of a resting order
+BELOW = "below"  # fires once price <= level (buy limit, sell stop)
+ABOVE = "above"  # fires once price >= level (sell limit, buy stop)
+
+
+class RestingOrder:
+    """
+    One resting order. side is +1 (buy) or -1 (sell).
+
+    reason is the exit_reason written to trade_logs when the order closes a
+    position. An order may cancel its OCO siblings when it fills, and may
+    carry a bracket's stop-loss/take-profit levels, which are placed as an
+    OCO pair once the order (the bracket entry) has filled.
+    """
+
+    __slots__ = ("order_id", "side", "order_type", "price", "qty", "reason", "reduce_only",
+                 "oco", "stop_loss", "take_profit", "bracket")
+
+    def __init__(self, order_id, side, order_type, price, qty, reason, reduce_only=False,
+                 stop_loss=None, take_profit=None, bracket=False):
+        self.order_id = order_id
+        self.side = side
+        self.order_type = order_type
+        self.price = float(price)
+        self.qty = int(qty)
+        self.reason = reason
+        self.reduce_only = reduce_only
+        self.oco = ()
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.bracket = bracket  # True: place SL/TP children after this fills
+
+    @property
+    def trigger(self):
+        if self.order_type == LIMIT:
+            return BELOW if self.side > 0 else ABOVE
+        return ABOVE if self.side > 0 else BELOW
+
+    def to_dict(self) -> dict:
+        return {
+            "order_id": self.order_id,
+            "side": "BUY" if self.side > 0 else "SELL",
+            "order_type": self.order_type,
+            "price": round(self.price, 2),
+            "qty": self.qty,
+            "reason": self.reason,
+            "stop_loss": self.stop_loss,
+            "take_profit": self.take_profit,
+        }
+
+
+class RestingOrders:
+    """
+    Resting limit/stop orders of one symbol, matched against whole tick batches.
+
+    Orders sit in two price-sorted arrays: levels that fire when the price
+    falls to them (buy limits, sell stops) and levels that fire when it
+    rises to them (sell limits, buy stops). For a batch, the running min and
+    max of the prices are computed once; the orders that trigger anywhere
+    in the batch are a contiguous slice of each sorted array, and the first
+    tick at which each of them triggers is a searchsorted into the
+    (monotonic) running min/max. Matching m resting orders against n ticks
+    therefore costs O(n + k log n) for the k orders that actually fire,
+    instead of O(n * m).
+    """
+
+    def __init__(self, new_id=None):
+        """
+        Args:
+            new_id: Callable returning the next order id (an OrderManager
+                shares one across symbols), else ids count from 1
+        """
+        self.orders = {}
+        self._new_id = new_id or itertools.count(1).__next__
+        self._levels = {BELOW: np.empty(0), ABOVE: np.empty(0)}
+        self._order_ids = {BELOW: np.empty(0, dtype=np.int64), ABOVE: np.empty(0, dtype=np.int64)}
+
+    def __len__(self):
+        return len(self.orders)
+
+    # =========================
+    # Placing / cancelling
+    # =========================
+    def place(self, side, order_type, price, qty, reason=None, reduce_only=False,
+              stop_loss=None, take_profit=None) -> RestingOrder:
+        """
+        Rest a LIMIT or STOP order.
+
+        Args:
+            side: +1 (buy) or -1 (sell)
+            order_type: LIMIT or STOP
+            price: Limit price / stop trigger
+            qty: Quantity
+            reason: exit_reason when it closes a position (default: the type)
+            reduce_only: Only ever reduce the current position
+            stop_loss, take_profit: Bracket levels placed once this fills
+
+        Raises:
+            ValueError: On an unknown order type or a non-positive qty
+        """
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Unknown order type: {order_type}")
+        if int(qty) <= 0:
+            raise ValueError(f"Invalid quantity: {qty}")
+
+        order = RestingOrder(self._new_id(), side, order_type, price, qty, reason or order_type.lower(),
+                             reduce_only, stop_loss, take_profit,
+                             bracket=stop_loss is not None or take_profit is not None)
+        self._insert(order)
+        return order
+
+    def place_oco(self, orders) -> list:
+        """
+        Link already placed orders so that the first to fill cancels the rest.
+        """
+        ids = tuple(order.order_id for order in orders)
+        for order in orders:
+            order.oco = tuple(i for i in ids if i != order.order_id)
+        return list(orders)
+
+    def place_bracket_exits(self, side, qty, stop_loss=None, take_profit=None) -> list:
+        """
+        Rest the reduce-only exits of a filled bracket entry as an OCO pair.
+
+        Args:
+            side: Side of the entry (+1 long, -1 short); exits are opposite
+        """
+        exits = []
+        if stop_loss is not None:
+            exits.append(self.place(-side, STOP, stop_loss, qty, "stop_loss", reduce_only=True))
+        if take_profit is not None:
+            exits.append(self.place(-side, LIMIT, take_profit, qty, "take_profit", reduce_only=True))
+        for order in exits:
+            # Logged on the closed trade (stop_loss/take_profit columns)
+            order.stop_loss, order.take_profit = stop_loss, take_profit
+        return self.place_oco(exits)
+
+    def cancel(self, order_id) -> bool:
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return False
+        trigger = order.trigger
+        keep = self._order_ids[trigger] != order_id
+        self._levels[trigger] = self._levels[trigger][keep]
+        self._order_ids[trigger] = self._order_ids[trigger][keep]
+        return True
+
+    def _insert(self, order):
+        trigger = order.trigger
+        levels = self._levels[trigger]
+        at = np.searchsorted(levels, order.price, side="right")
+        self._levels[trigger] = np.insert(levels, at, order.price)
+        self._order_ids[trigger] = np.insert(self._order_ids[trigger], at, order.order_id)
+        self.orders[order.order_id] = order
+
+    # =========================
+    # Snapshots
+    # =========================
+    def snapshot(self) -> list:
+        """
+        Resting orders as JSON-serializable dicts, in time priority.
+        """
+        return [
+            {name: getattr(order, name) for name in RestingOrder.__slots__}
+            for _, order in sorted(self.orders.items())
+        ]
+
+    @classmethod
+    def from_snapshot(cls, orders, new_id=None) -> "RestingOrders":
+        resting = cls(new_id)
+        for state in orders:
+            order = RestingOrder(state["order_id"], state["side"], state["order_type"], state["price"],
+                                 state["qty"], state["reason"], state["reduce_only"],
+                                 state["stop_loss"], state["take_profit"], state["bracket"])
+            order.oco = tuple(state["oco"])
+            resting._insert(order)  # In id order, so ties keep their time priority
+        return resting
+
+    # =========================
+    # Matching
+    # =========================
+    def crossings(self, prices, start=0):
+        """
+        First tick at which each resting order triggers within prices[start:].
+
+        Returns:
+            (ticks, order_ids), sorted by tick then by order id (time priority)
+        """
+        segment = np.asarray(prices, dtype=np.float64)[start:]
+        if not len(segment) or not self.orders:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        running_min = np.minimum.accumulate(segment)
+        running_max = np.maximum.accumulate(segment)
+
+        # Falling triggers: every level >= the batch low fires
+        below = self._levels[BELOW]
+        first = np.searchsorted(below, running_min[-1], side="left")
+        below_ticks = np.searchsorted(-running_min, -below[first:], side="left")
+        below_ids = self._order_ids[BELOW][first:]
+
+        # Rising triggers: every level <= the batch high fires
+        above = self._levels[ABOVE]
+        last = np.searchsorted(above, running_max[-1], side="right")
+        above_ticks = np.searchsorted(running_max, above[:last], side="left")
+        above_ids = self._order_ids[ABOVE][:last]
+
+        ticks = np.concatenate([below_ticks, above_ticks]) + start
+        ids = np.concatenate([below_ids, above_ids])
+        order = np.lexsort((ids, ticks))
+        return ticks[order], ids[order]
@@ -0,0 +1,106 @@
+# File: backend/app/metrics.py
+#
+# Custom Prometheus metrics. They register on the default registry, so they
+# are served by the Instrumentator's existing /metrics endpoint.
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Tick cache ---
+TICK_CACHE_HITS = Counter(
+    "tradeshift_tick_cache_hits_total",
+    "Synthesized tick days served from cache",
+    ["tier"],
+)
+TICK_CACHE_MISSES = Counter(
+    "tradeshift_tick_cache_misses_total",
+    "Synthesized tick days not found in any cache tier",
+)
+TICK_CACHE_EVICTIONS = Counter(
+    "tradeshift_tick_cache_evictions_total",
+    "Tick days evicted from the in-process LRU",
+)
+TICK_CACHE_BYTES = Gauge(
+    "tradeshift_tick_cache_bytes",
+    "Bytes held by the in-process tick cache",
+)
+
+# --- Replay clock ---
+TICKS_STREAMED = Counter(
+    "tradeshift_ticks_streamed_total",
+    "Ticks sent to WebSocket clients",
+)
+REPLAY_ACTUAL_SPEED = Histogram(
+    "tradeshift_replay_actual_speed",
+    "Achieved replay speed (simulated seconds per wall second)",
+    buckets=(1, 2, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+REPLAY_SPEED_RATIO = Histogram(
+    "tradeshift_replay_speed_ratio",
+    "Achieved / target replay speed for paced sessions",
+    buckets=(0.5, 0.8, 0.9, 0.95, 0.99, 1.01, 1.05, 1.1, 1.5, 2.0),
+)
+
+# --- Outbound backpressure ---
+OUTBOUND_QUEUE_DEPTH = Histogram(
+    "tradeshift_outbound_queue_depth",
+    "Frames waiting in a session's outbound buffer when a frame is queued",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64),
+)
+OUTBOUND_DROPPED_TICKS = Counter(
+    "tradeshift_outbound_dropped_ticks_total",
+    "Ticks dropped or conflated for slow WebSocket consumers",
+    ["policy"],
+)
+
+# --- Shared rooms ---
+ROOMS_ACTIVE = Gauge(
+    "tradeshift_rooms_active",
+    "Shared replay rooms with a running producer",
+)
+ROOM_SUBSCRIBERS = Gauge(
+    "tradeshift_room_subscribers",
+    "Sessions subscribed to a shared replay room",
+)
+
+# --- Trade journal ---
+JOURNAL_QUEUE_DEPTH = Gauge(
+    "tradeshift_trade_journal_queue_depth",
+    "Closed trades waiting to be written to trade_logs",
+)
+JOURNAL_FLUSH_SECONDS = Histogram(
+    "tradeshift_trade_journal_flush_seconds",
+    "Latency of bulk trade_logs inserts",
+)
+JOURNAL_SPILLED_TRADES = Counter(
+    "tradeshift_trade_journal_spilled_total",
+    "Trades written to the local spill file after a failed flush",
+)
+
+# --- Dataset catalog / disk cache ---
+DATASET_CACHE_REQUESTS = Counter(
+    "tradeshift_dataset_cache_requests_total",
+    "Parquet datasets served from local disk (hit) or fetched from MinIO (miss)",
+    ["result"],
+)
+DATASET_CACHE_BYTES = Gauge(
+    "tradeshift_dataset_cache_bytes",
+    "Bytes of Parquet held in the local dataset cache",
+)
+
+# --- News sentiment index ---
+SENTIMENT_EVENTS = Counter(
+    "tradeshift_sentiment_events_total",
+    "News events folded into the in-memory sentiment index",
+)
+
+# --- Session snapshots / resume ---
+SESSION_RESUMES = Counter(
+    "tradeshift_session_resumes_total",
+    "Reconnects resumed from a parked session (memory), a Redis snapshot (redis) or not at all (failed)",
+    ["source"],
+)
+SESSION_RESUME_SECONDS = Histogram(
+    "tradeshift_session_resume_seconds",
+    "Time from a reconnect with a session token to the resumed stream",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
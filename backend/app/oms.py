@@ -1,122 +1,365 @@
 # File: backend/app/oms.py
 
-from datetime import datetime
-from .models import TradeLog, SessionLocal
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .matching import RestingOrders
+from .positions import PositionBook
+from .trade_journal import trade_journal
+
+_EPOCH = datetime(1970, 1, 1)
 
 
 class OrderManager:
-    def __init__(self):
-        self.is_in_position = False
-        self.entry_price = 0.0
-        self.quantity = 0
-        self.direction = 0  # 1: Long, -1: Short
+    """
+    Per-session order manager on top of a multi-symbol PositionBook.
+
+    BUY and SELL are signed fills: they add to the open side or close it
+    lot by lot (FIFO or average cost), so partial closes, scaling in and
+    flipping from long to short all work, and every closed portion -
+    long or short - is written to the trade journal.
+
+    Resting LIMIT/STOP, bracket and OCO orders live in one RestingOrders
+    book per symbol and are matched against each tick batch in
+    process_batch().
+    """
+
+    def __init__(self, symbol="NIFTY", accounting="fifo", journal=None, verbose=True):
+        """
+        Args:
+            symbol: Default symbol for orders that don't name one
+            accounting: "fifo" or "average" (see PositionBook)
+            journal: Where closed trades are recorded (anything with a
+                record(dict) method); defaults to the write-behind trade_journal
+            verbose: Print every fill (off for headless backtests)
+        """
+        self.symbol = symbol
+        self.journal = journal if journal is not None else trade_journal
+        self.verbose = verbose
+        self.book = PositionBook(accounting)
+        self.orders = {}  # symbol -> RestingOrders
+        self._next_order_id = 1  # Shared by every symbol's book, so ids are unique per session
 
         # 🔥 NEW STATE FOR ANALYTICS
         self.session_id = "default_session"
-        self.entry_time = None
         self.last_trade_exit_time = None
         self.trade_counter = 0
 
     # =========================
-    # BUY (open long)
+    # Position (default symbol)
     # =========================
-    def buy(self, price: float, qty: int):
+    @property
+    def position(self) -> int:
         """
-        Executes a BUY (opens Long)
+        Signed net quantity (+long, -short).
         """
-        self.is_in_position = True
-        self.entry_price = float(price)
-        self.quantity = qty
-        self.direction = 1
+        return self.book.position(self.symbol)
 
-        # Track entry time
-        self.entry_time = datetime.utcnow()
+    @property
+    def is_in_position(self) -> bool:
+        return self.position != 0
 
-        print(f"🔵 OMS: BUY executed at {price} (Qty: {qty})")
+    @property
+    def direction(self) -> int:
+        return int(np.sign(self.position))  # 1: Long, -1: Short, 0: Flat
+
+    @property
+    def quantity(self) -> int:
+        return abs(self.position)
+
+    @property
+    def entry_price(self) -> float:
+        return self.book.average_price(self.symbol)
+
+    @property
+    def realized_pnl(self) -> float:
+        return float(self.book.realized.sum())
 
     # =========================
-    # SELL
+    # BUY / SELL
     # =========================
-    def sell(self, price: float, qty: int):
+    def buy(self, price: float, qty: int, symbol=None, when=None, exit_reason="manual",
+            stop_loss=None, take_profit=None) -> float:
+        """
+        Executes a BUY: covers shorts first, any remainder opens/extends a long.
+
+        Args:
+            stop_loss, take_profit: Optional bracket exits, rested as an OCO
+                pair for the bought quantity
+
+        Returns:
+            Realized PnL of this fill
         """
-        Executes a SELL.
-        - If Long: closes trade and logs to DB
-        - Else: opens Short
+        symbol = symbol or self.symbol
+        pnl = self._execute(symbol, qty, price, when, exit_reason)
+        if self.verbose:
+            print(f"🔵 OMS: BUY executed at {price} (Qty: {qty})")
+        if stop_loss is not None or take_profit is not None:
+            self.orders_for(symbol).place_bracket_exits(1, qty, stop_loss, take_profit)
+        return pnl
+
+    def sell(self, price: float, qty: int, symbol=None, when=None, exit_reason="manual",
+             stop_loss=None, take_profit=None) -> float:
         """
-        price = float(price)
+        Executes a SELL: closes longs first, any remainder opens/extends a short.
 
-        # =========================
-        # CLOSE LONG → SAVE TRADE
-        # =========================
-        if self.is_in_position and self.direction == 1:
+        Args:
+            stop_loss, take_profit: Optional bracket exits, rested as an OCO
+                pair for the sold quantity
 
-            pnl = (price - self.entry_price) * self.quantity * self.direction
-            exit_time = datetime.utcnow()
+        Returns:
+            Realized PnL of this fill
+        """
+        symbol = symbol or self.symbol
+        pnl = self._execute(symbol, -qty, price, when, exit_reason)
+        if self.verbose:
+            print(f"🔴 OMS: SELL executed at {price} (Qty: {qty})")
+        if stop_loss is not None or take_profit is not None:
+            self.orders_for(symbol).place_bracket_exits(-1, qty, stop_loss, take_profit)
+        return pnl
 
-            holding_time = (exit_time - self.entry_time).total_seconds()
-
-            time_since_last = 0.0
-            if self.last_trade_exit_time:
-                time_since_last = (exit_time - self.last_trade_exit_time).total_seconds()
-
-            self.trade_counter += 1
-
-            print(f"🔴 OMS: CLOSED LONG at {price} | Realized PnL: {pnl:.2f}")
-
-            # 🔥 SAVE TO DATABASE
-            db = SessionLocal()
-
-            trade = TradeLog(
-                symbol="NIFTY",
-                direction="LONG",
-                entry_price=self.entry_price,
-                exit_price=price,
-                quantity=self.quantity,
-                pnl=pnl,
-                entry_time=self.entry_time,
-                exit_time=exit_time,
-                session_id=self.session_id,
-                holding_time=holding_time,
-                trade_number=self.trade_counter,
-                stop_loss=None,
-                take_profit=None,
-                exit_reason="manual",
-                time_since_last_trade=time_since_last
-            )
-
-            db.add(trade)
-            db.commit()
-            db.close()
-
-            self.last_trade_exit_time = exit_time
-
-            # Reset state
-            self.is_in_position = False
-            self.entry_price = 0.0
-            self.quantity = 0
-            self.direction = 0
-            self.entry_time = None
-
-            return pnl
-
-        # =========================
-        # OPEN SHORT (no logging yet)
-        # =========================
+    def _execute(self, symbol, qty, price, when, exit_reason, stop_loss=None, take_profit=None) -> float:
+        if when is None:
+            exit_time = datetime.utcnow()
+        elif isinstance(when, (int, float)):
+            exit_time = _EPOCH + timedelta(seconds=when)  # Simulated tick epoch
         else:
-            self.is_in_position = True
-            self.entry_price = price
-            self.quantity = qty
-            self.direction = -1
-            self.entry_time = datetime.utcnow()
+            exit_time = when
+        closed = self.book.fill(symbol, qty, price, exit_time)
+        for trade in closed:
+            self._log_trade(symbol, trade, exit_time, exit_reason, stop_loss, take_profit)
+        return sum(trade["pnl"] for trade in closed)
+
+    # =========================
+    # Resting orders
+    # =========================
+    def orders_for(self, symbol=None) -> RestingOrders:
+        symbol = symbol or self.symbol
+        resting = self.orders.get(symbol)
+        if resting is None:
+            resting = self.orders[symbol] = RestingOrders(self._new_order_id)
+        return resting
+
+    def _new_order_id(self) -> int:
+        order_id = self._next_order_id
+        self._next_order_id += 1
+        return order_id
+
+    def place_order(self, side, order_type, price, qty, symbol=None, stop_loss=None, take_profit=None):
+        """
+        Rest a LIMIT or STOP order; with stop_loss/take_profit it is a bracket entry.
+
+        Raises:
+            ValueError: On an unknown order type or a non-positive qty
+        """
+        order = self.orders_for(symbol).place(side, order_type, price, qty,
+                                              stop_loss=stop_loss, take_profit=take_profit)
+        if self.verbose:
+            print(f"📝 OMS: {order.order_type} {'BUY' if side > 0 else 'SELL'} resting at {order.price} (Qty: {qty})")
+        return order
+
+    def place_oco(self, legs, symbol=None) -> list:
+        """
+        Rest several orders (dicts of place_order arguments) as one OCO group.
+        """
+        resting = self.orders_for(symbol)
+        orders = []
+        try:
+            for leg in legs:
+                orders.append(resting.place(leg["side"], leg["order_type"], leg["price"], leg["qty"]))
+        except (KeyError, TypeError, ValueError):
+            for order in orders:
+                resting.cancel(order.order_id)
+            raise
+        return resting.place_oco(orders)
+
+    def cancel_order(self, order_id) -> bool:
+        return any(resting.cancel(order_id) for resting in self.orders.values())
+
+    def open_orders(self) -> list:
+        return [order.to_dict() for resting in self.orders.values() for order in resting.orders.values()]
+
+    def process_batch(self, prices, times=None, symbol=None):
+        """
+        Match resting orders against a tick batch, then mark it to market.
+
+        Triggered orders fill at the price of the tick that crossed them, in
+        tick order. A filled order cancels its OCO siblings, and a filled
+        bracket entry rests its exits, which may trigger later in the same
+        batch. Unrealized PnL is computed per segment between fills, so each
+        tick reflects the position held at that tick.
+
+        Args:
+            prices: Tick prices for symbol
+            times: Optional fill time per tick (datetimes or epoch
+                seconds), else now (UTC)
+
+        Returns:
+            (pnl, fills): float64 unrealized PnL per tick, and one dict per fill
+        """
+        symbol = symbol or self.symbol
+        prices = np.asarray(prices, dtype=np.float64)
+        pnl = np.empty(len(prices))
+        fills = []
+
+        resting = self.orders.get(symbol)
+        marked = 0
+        scan_from = 0
+        while resting:
+            ticks, order_ids = resting.crossings(prices, scan_from)
+            rescan = False
+            for tick, order_id in zip(ticks.tolist(), order_ids.tolist()):
+                order = resting.orders.get(order_id)
+                if order is None:
+                    continue  # Cancelled by an OCO sibling earlier in this batch
+
+                pnl[marked:tick] = self.book.unrealized(symbol, prices[marked:tick])
+                marked = tick
+
+                when = times[tick] if times is not None else None
+                fill = self._fill_resting(resting, order, float(prices[tick]), when, symbol)
+                if fill is not None:
+                    fills.append(fill)
+                    if order.bracket:
+                        # New exits rested: rescan the rest of the batch from this tick
+                        scan_from, rescan = tick, True
+                        break
+            if not rescan:
+                break
+
+        pnl[marked:] = self.book.unrealized(symbol, prices[marked:])
+        return pnl, fills
+
+    def _fill_resting(self, resting, order, price, when, symbol):
+        resting.cancel(order.order_id)
+        for sibling in order.oco:
+            resting.cancel(sibling)
+
+        qty = order.qty
+        if order.reduce_only:
+            qty = min(qty, max(0, -order.side * self.book.position(symbol)))
+            if qty == 0:
+                return None  # Position already closed by another order
+
+        pnl = self._execute(symbol, order.side * qty, price, when, order.reason,
+                            order.stop_loss, order.take_profit)
+        if order.bracket:
+            resting.place_bracket_exits(order.side, qty, order.stop_loss, order.take_profit)
+
+        side = "BUY" if order.side > 0 else "SELL"
+        if self.verbose:
+            print(f"🎯 OMS: {order.order_type} {side} #{order.order_id} filled at {price} (Qty: {qty}, {order.reason})")
+        return {
+            "order_id": order.order_id,
+            "side": side,
+            "price": round(price, 2),
+            "qty": qty,
+            "reason": order.reason,
+            "realized_pnl": round(pnl, 2),
+        }
+
+    def _log_trade(self, symbol, trade, exit_time, exit_reason, stop_loss=None, take_profit=None):
+        holding_time = (exit_time - trade["entry_time"]).total_seconds()
+
+        time_since_last = 0.0
+        if self.last_trade_exit_time:
+            time_since_last = (exit_time - self.last_trade_exit_time).total_seconds()
+
+        self.trade_counter += 1
+        if self.verbose:
+            print(f"🔴 OMS: CLOSED {trade['direction']} at {trade['exit_price']} | Realized PnL: {trade['pnl']:.2f}")
 
-            print(f"🔴 OMS: SHORT executed at {price} (Qty: {qty})")
+        # 🔥 SAVE TO DATABASE (write-behind, never blocks the stream)
+        self.journal.record(dict(
+            symbol=symbol,
+            direction=trade["direction"],
+            entry_price=trade["entry_price"],
+            exit_price=trade["exit_price"],
+            quantity=trade["quantity"],
+            pnl=trade["pnl"],
+            entry_time=trade["entry_time"],
+            exit_time=exit_time,
+            session_id=self.session_id,
+            holding_time=holding_time,
+            trade_number=self.trade_counter,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            exit_reason=exit_reason,
+            time_since_last_trade=time_since_last
+        ))
 
-            return 0.0
+        self.last_trade_exit_time = exit_time
+
+    # =========================
+    # Snapshots
+    # =========================
+    def snapshot(self) -> dict:
+        """
+        JSON-serializable state: positions, resting orders and the counters
+        that number orders and trades (see restore).
+        """
+        return {
+            "symbol": self.symbol,
+            "session_id": self.session_id,
+            "trade_counter": self.trade_counter,
+            "last_trade_exit_time": (
+                self.last_trade_exit_time.isoformat() if self.last_trade_exit_time is not None else None
+            ),
+            "next_order_id": self._next_order_id,
+            "book": self.book.snapshot(),
+            "orders": {symbol: resting.snapshot() for symbol, resting in self.orders.items()},
+        }
+
+    def restore(self, state):
+        """
+        Replace this manager's state with a snapshot() of another one.
+        """
+        self.symbol = state["symbol"]
+        self.session_id = state["session_id"]
+        self.trade_counter = state["trade_counter"]
+        last_exit = state["last_trade_exit_time"]
+        self.last_trade_exit_time = datetime.fromisoformat(last_exit) if last_exit else None
+        self.book = PositionBook.from_snapshot(state["book"])
+        self._next_order_id = state["next_order_id"]
+        self.orders = {
+            symbol: RestingOrders.from_snapshot(orders, self._new_order_id)
+            for symbol, orders in state["orders"].items()
+        }
 
     # =========================
     # Unrealized PnL
     # =========================
-    def calculate_pnl(self, current_price: float) -> float:
-        if not self.is_in_position:
-            return 0.0
-        return (float(current_price) - self.entry_price) * self.quantity * self.direction
+    def calculate_pnl(self, current_price: float, symbol=None) -> float:
+        return float(self.book.unrealized(symbol or self.symbol, current_price))
+
+    def mark_to_market(self, prices, symbol=None):
+        """
+        Unrealized PnL at every price of a tick batch, in one vectorized call.
+
+        Args:
+            prices: Array of tick prices for symbol (default symbol if None)
+
+        Returns:
+            float64 array, same length as prices
+        """
+        return self.book.unrealized(symbol or self.symbol, prices)
+
+    def summary(self) -> dict:
+        """
+        Open positions and realized PnL per symbol (for STATS).
+        """
+        book = self.book
+        return {
+            "realized_pnl": round(self.realized_pnl, 2),
+            "trades": self.trade_counter,
+            "open_orders": sum(len(resting) for resting in self.orders.values()),
+            "positions": {
+                symbol: {
+                    "position": int(book.net_qty[i]),
+                    "avg_price": round(book.average_price(symbol), 2),
+                    "realized_pnl": round(float(book.realized[i]), 2),
+                }
+                for symbol, i in book.symbols.items()
+            },
+        }
@@ -0,0 +1,264 @@
+# File: backend/app/outbound.py
+
+import asyncio
+import datetime
+import os
+from collections import deque
+
+from .metrics import OUTBOUND_DROPPED_TICKS, OUTBOUND_QUEUE_DEPTH
+from .wire import EPOCH_DT, encode_batch, encode_batch_json
+
+OUTBOUND_MAX_FRAMES = int(os.getenv("OUTBOUND_MAX_FRAMES", "32"))
+OUTBOUND_POLICY = os.getenv("OUTBOUND_POLICY", "drop")
+
+POLICIES = ("block", "drop", "conflate")
+
+# Frame kinds held in the buffer
+TICKS = "ticks"      # (TICKS, epochs, prices, pnl)
+SHARED = "shared"    # (SHARED, wire.SharedFrame) - pre-encoded room frame
+OHLC = "ohlc"        # (OHLC, summary dict)
+MESSAGE = "message"  # (MESSAGE, JSON payload) - never dropped
+LATEST = "latest"    # (LATEST, key) - only the newest payload put under key is sent
+CONTROL = (MESSAGE, LATEST)
+
+
+class OutboundBuffer:
+    """
+    Bounded outbound queue between a session's writer and its WebSocket.
+
+    A dedicated sender task drains the queue, so a stalled client only ever
+    blocks its own sender. Tick frames are encoded when sent, not when
+    queued, so frames that get dropped are never serialized. When more than
+    max_frames tick frames are waiting, the policy decides what happens:
+
+    - block: the writer waits for space (the replay pauses)
+    - drop: queued ticks are discarded, only the latest price is kept
+    - conflate: queued ticks are merged into a single OHLC summary frame
+
+    Control messages (ORDER, ERROR, ...) are always delivered in order.
+    Periodic status messages (PNL, SENTIMENT) are put with put_latest: a
+    key holds at most one queued message, updated in place, so they never
+    build a backlog behind a slow client.
+    """
+
+    def __init__(self, websocket, symbol, wire_format="json", policy=OUTBOUND_POLICY, max_frames=OUTBOUND_MAX_FRAMES):
+        self.websocket = websocket
+        self.symbol = symbol
+        self.wire_format = wire_format
+        self.policy = policy if policy in POLICIES else "drop"
+        self.max_frames = max_frames
+
+        self._frames = deque()
+        self._tick_frames = 0
+        self._latest = {}  # key -> newest payload of a queued LATEST frame
+        self._not_empty = asyncio.Event()
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+
+        # Per-session counters
+        self.sent_frames = 0
+        self.dropped_ticks = 0
+        self.conflated_ticks = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._frames)
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "sent_frames": self.sent_frames,
+            "dropped_ticks": self.dropped_ticks,
+            "conflated_ticks": self.conflated_ticks,
+        }
+
+    def pending_ticks(self) -> int:
+        """
+        Ticks queued but not yet sent (a resumed session replays them).
+        """
+        return sum(_frame_ticks(frame) for frame in self._frames if frame[0] not in CONTROL)
+
+    def set_policy(self, policy):
+        if policy in POLICIES:
+            self.policy = policy
+
+    # =========================
+    # Producer side
+    # =========================
+    def put_message(self, payload: dict):
+        self._frames.append((MESSAGE, payload))
+        self._not_empty.set()
+
+    def put_latest(self, key, payload: dict):
+        """
+        Queue a status message, replacing one still queued under the same key.
+        """
+        if key not in self._latest:
+            self._frames.append((LATEST, key))
+            self._not_empty.set()
+        self._latest[key] = payload
+
+    async def put_ticks(self, epochs, prices, pnl, block=False):
+        """
+        Queue one tick frame, applying the overflow policy if the buffer is full.
+
+        Args:
+            epochs: float64 array of tick epoch seconds
+            prices, pnl: Lists of tick prices and PnL
+            block: Force the block policy (used at max speed, where the
+                replay should run exactly as fast as the client consumes)
+        """
+        if block or self.policy == "block":
+            while self._tick_frames >= self.max_frames:
+                self._has_space.clear()
+                await self._has_space.wait()
+        self._put((TICKS, epochs, prices, pnl))
+
+    def put_shared(self, frame):
+        """
+        Queue a pre-encoded room frame without ever waiting.
+
+        A room must not be slowed down by one subscriber, so the block
+        policy behaves like drop here.
+        """
+        self._put((SHARED, frame))
+
+    def _put(self, frame):
+        if self._tick_frames < self.max_frames:
+            self._frames.append(frame)
+            self._tick_frames += 1
+        elif self.policy == "conflate":
+            self._conflate(frame)
+        else:
+            self._drop_to_latest(frame)
+
+        depth = len(self._frames)
+        self.max_depth = max(self.max_depth, depth)
+        OUTBOUND_QUEUE_DEPTH.observe(depth)
+        self._not_empty.set()
+
+    def _take_tick_frames(self):
+        """
+        Remove every queued tick frame, keeping control messages in place.
+        """
+        kept, taken = deque(), []
+        for frame in self._frames:
+            (taken if frame[0] not in CONTROL else kept).append(frame)
+        self._frames = kept
+        self._tick_frames = 0
+        return taken
+
+    def _drop_to_latest(self, frame):
+        epochs, prices, pnl = _columns(frame)
+        dropped = sum(_frame_ticks(queued) for queued in self._take_tick_frames())
+        dropped += len(prices) - 1
+
+        self._frames.append((TICKS, epochs[-1:], prices[-1:], pnl[-1:]))
+        self._tick_frames += 1
+
+        self.dropped_ticks += dropped
+        OUTBOUND_DROPPED_TICKS.labels(policy="drop").inc(dropped)
+
+    def _conflate(self, frame):
+        summary = None
+        conflated = 0
+        for queued in self._take_tick_frames() + [frame]:
+            summary = _merge(summary, _summarize(queued))
+            if queued[0] != OHLC:  # Ticks already in a summary were counted then
+                conflated += _frame_ticks(queued)
+
+        self._frames.append((OHLC, summary))
+        self._tick_frames += 1
+
+        self.conflated_ticks += conflated
+        OUTBOUND_DROPPED_TICKS.labels(policy="conflate").inc(conflated)
+
+    # =========================
+    # Sender task
+    # =========================
+    async def run(self):
+        """
+        Send queued frames until cancelled or the socket fails.
+        """
+        while True:
+            while not self._frames:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+
+            frame = self._frames.popleft()
+            if frame[0] == LATEST:
+                frame = (MESSAGE, self._latest.pop(frame[1]))
+            elif frame[0] != MESSAGE:
+                self._tick_frames -= 1
+                self._has_space.set()
+
+            await self._send(frame)
+            self.sent_frames += 1
+
+    async def _send(self, frame):
+        kind = frame[0]
+        if kind == MESSAGE:
+            await self.websocket.send_json(frame[1])
+        elif kind == OHLC:
+            await self.websocket.send_json({"type": "OHLC", "symbol": self.symbol, "data": frame[1]})
+        elif kind == SHARED:
+            payload = frame[1].encoded(self.wire_format)
+            if self.wire_format == "binary":
+                await self.websocket.send_bytes(payload)
+            else:
+                await self.websocket.send_text(payload)
+        elif self.wire_format == "binary":
+            _, epochs, prices, pnl = frame
+            base_epoch = float(epochs[0])
+            await self.websocket.send_bytes(encode_batch(self.symbol, base_epoch, prices, epochs - base_epoch, pnl))
+        else:
+            _, epochs, prices, pnl = frame
+            await self.websocket.send_text(encode_batch_json(self.symbol, epochs, prices, pnl))
+
+
+def _frame_ticks(frame) -> int:
+    return frame[1]["ticks"] if frame[0] == OHLC else len(_columns(frame)[1])
+
+
+def _columns(frame):
+    """
+    (epochs, prices, pnl) of a TICKS or SHARED frame; shared frames have no PnL.
+    """
+    if frame[0] == SHARED:
+        shared = frame[1]
+        return shared.epochs, list(shared.prices), [0.0] * len(shared.prices)
+    return frame[1], frame[2], frame[3]
+
+
+def _summarize(frame) -> dict:
+    if frame[0] == OHLC:
+        return frame[1]
+    epochs, prices, pnl = _columns(frame)
+    return {
+        "open": round(prices[0], 2),
+        "high": round(max(prices), 2),
+        "low": round(min(prices), 2),
+        "close": round(prices[-1], 2),
+        "pnl": round(pnl[-1], 2),
+        "from": (EPOCH_DT + datetime.timedelta(seconds=float(epochs[0]))).isoformat(),
+        "to": (EPOCH_DT + datetime.timedelta(seconds=float(epochs[-1]))).isoformat(),
+        "ticks": len(prices),
+    }
+
+
+def _merge(first, second) -> dict:
+    if first is None:
+        return second
+    return {
+        "open": first["open"],
+        "high": max(first["high"], second["high"]),
+        "low": min(first["low"], second["low"]),
+        "close": second["close"],
+        "pnl": second["pnl"],
+        "from": first["from"],
+        "to": second["to"],
+        "ticks": first["ticks"] + second["ticks"],
+    }
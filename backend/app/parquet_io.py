@@ -0,0 +1,303 @@
+# File: backend/app/parquet_io.py
+#
+# Parquet access built on pyarrow datasets. Date filters are pushed down to
+# row groups (skipped via their footer min/max statistics), only the OHLC
+# columns are decoded, and data arrives as a stream of record batches, so
+# memory scales with the requested window rather than with the file.
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATE_COLUMNS = ("date", "datetime")
+PRICE_COLUMNS = ("open", "high", "low", "close")
+STREAM_BATCH_ROWS = 64 * 1024
+PARTITION_MIN_ROW_GROUP_ROWS = 256  # Days are merged into row groups of at least this many rows
+PARTITION_FILE_NAME = "data.parquet"
+
+
+def date_column(schema) -> str:
+    """
+    Name of the timestamp column ('date' or 'datetime', any case).
+
+    Raises:
+        ValueError: If the schema has neither
+    """
+    names = {name.lower(): name for name in schema.names}
+    for candidate in DATE_COLUMNS:
+        if candidate in names:
+            return names[candidate]
+    raise ValueError("Dataset has no date column")
+
+
+def _column(schema, name) -> str:
+    for field in schema.names:
+        if field.lower() == name:
+            return field
+    raise ValueError(f"Dataset has no '{name}' column")
+
+
+def _bound(field_type, when):
+    """
+    A filter scalar of the column's own type (pushdown needs matching types).
+    """
+    ts = pd.Timestamp(when)
+    if pa.types.is_timestamp(field_type):
+        if field_type.tz is not None:
+            ts = ts.tz_localize(field_type.tz) if ts.tzinfo is None else ts.tz_convert(field_type.tz)
+        elif ts.tzinfo is not None:
+            ts = ts.tz_localize(None)
+        return pa.scalar(ts, type=field_type)
+    if pa.types.is_date(field_type):
+        return pa.scalar(ts.date(), type=field_type)
+    return None  # e.g. string dates: no pushdown possible
+
+
+def _date_filter(schema, start=None, end=None):
+    """
+    Dataset expression for start <= date < end (either side optional).
+    """
+    name = date_column(schema)
+    field_type = schema.field(name).type
+    expression = None
+    for when, compare in ((start, "ge"), (end, "lt")):
+        if when is None:
+            continue
+        bound = _bound(field_type, when)
+        if bound is None:
+            return None
+        clause = ds.field(name) >= bound if compare == "ge" else ds.field(name) < bound
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def iter_candle_batches(path, start=None, end=None, batch_size=STREAM_BATCH_ROWS):
+    """
+    Stream [start, end) of a candle file as record batches.
+
+    Only the date and OHLC columns are read, and row groups whose footer
+    statistics fall outside the window are never decoded. Batches carry the
+    columns timestamp (naive, local wall time), open, high, low, close.
+    """
+    dataset = ds.dataset(path, format="parquet")
+    schema = dataset.schema
+    date_name = date_column(schema)
+    columns = [date_name] + [_column(schema, name) for name in PRICE_COLUMNS]
+
+    scanner = dataset.scanner(
+        columns=columns,
+        filter=_date_filter(schema, start, end),
+        batch_size=batch_size,
+    )
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield _normalize(batch, date_name, columns)
+
+
+def _normalize(batch, date_name, columns):
+    arrays = [_normalize_timestamps(batch.column(date_name))]
+    arrays += [batch.column(name).cast(pa.float64()) for name in columns[1:]]
+    return pa.RecordBatch.from_arrays(arrays, names=["timestamp", *PRICE_COLUMNS])
+
+
+def _normalize_timestamps(timestamps):
+    """
+    Naive timestamp[ns] in local wall time (what tz_localize(None) gives).
+    """
+    if pa.types.is_timestamp(timestamps.type) and timestamps.type.tz is not None:
+        timestamps = pc.local_timestamp(timestamps)
+    elif not pa.types.is_timestamp(timestamps.type):
+        timestamps = pa.array(pd.to_datetime(timestamps.to_pandas()).to_numpy(dtype="datetime64[ns]"))
+    return timestamps.cast(pa.timestamp("ns"))
+
+
+def read_candle_arrays(path, start=None, end=None) -> dict:
+    """
+    Load [start, end) into contiguous NumPy arrays, sorted by timestamp.
+
+    Returns:
+        Dict with timestamp (datetime64[ns]) and open/high/low/close (float64)
+    """
+    chunks = {name: [] for name in ("timestamp", *PRICE_COLUMNS)}
+    for batch in iter_candle_batches(path, start, end):
+        for name in chunks:
+            chunks[name].append(batch.column(name).to_numpy(zero_copy_only=False))
+
+    arrays = {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype="datetime64[ns]" if name == "timestamp" else np.float64)
+        for name, parts in chunks.items()
+    }
+    timestamps = arrays["timestamp"].astype("datetime64[ns]")
+    # String date columns could not be pushed down: filter after decoding
+    keep = np.ones(len(timestamps), dtype=bool)
+    if start is not None:
+        keep &= timestamps >= np.datetime64(pd.Timestamp(start).tz_localize(None), "ns")
+    if end is not None:
+        keep &= timestamps < np.datetime64(pd.Timestamp(end).tz_localize(None), "ns")
+
+    order = np.argsort(timestamps[keep], kind="stable")
+    result = {"timestamp": np.ascontiguousarray(timestamps[keep][order])}
+    for name in PRICE_COLUMNS:
+        result[name] = np.ascontiguousarray(arrays[name][keep][order])
+    return result
+
+
+def footer_stats(path) -> dict:
+    """
+    Row count and date bounds from the Parquet footer, without decoding data.
+
+    Falls back to scanning only the date column if a row group has no
+    statistics.
+
+    Returns:
+        Dict with rows, start and end (pd.Timestamp, naive local time)
+    """
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    name = date_column(schema)
+    index = schema.get_field_index(name)
+
+    lows, highs = [], []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(index).statistics
+        if stats is None or not stats.has_min_max:
+            return _scan_stats(path, name, metadata.num_rows)
+        lows.append(stats.min)
+        highs.append(stats.max)
+
+    if not lows:
+        return {"rows": metadata.num_rows, "start": None, "end": None}
+    return {
+        "rows": metadata.num_rows,
+        "start": _naive(min(lows), schema.field(name).type),
+        "end": _naive(max(highs), schema.field(name).type),
+    }
+
+
+def _scan_stats(path, name, rows):
+    table = ds.dataset(path, format="parquet").to_table(columns=[name])
+    bounds = pc.min_max(table.column(name))
+    field_type = table.schema.field(name).type
+    return {"rows": rows, "start": _naive(bounds["min"].as_py(), field_type),
+            "end": _naive(bounds["max"].as_py(), field_type)}
+
+
+def _naive(value, field_type):
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None and pa.types.is_timestamp(field_type) and field_type.tz is not None:
+        ts = ts.tz_localize("UTC")  # Footer stats of tz-aware columns are UTC instants
+    if ts.tzinfo is not None and pa.types.is_timestamp(field_type) and field_type.tz is not None:
+        ts = ts.tz_convert(field_type.tz)
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def trading_days(path, start=None, end=None) -> np.ndarray:
+    """
+    Sorted unique trading days in [start, end], reading only the date column.
+    """
+    dataset = ds.dataset(path, format="parquet")
+    name = date_column(dataset.schema)
+    if end is not None:
+        end = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+
+    days = []
+    for batch in dataset.scanner(columns=[name], filter=_date_filter(dataset.schema, start, end)).to_batches():
+        if batch.num_rows:
+            timestamps = _normalize_timestamps(batch.column(name))
+            days.append(np.unique(timestamps.to_numpy().astype("datetime64[D]")))
+    days = np.unique(np.concatenate(days)) if days else np.empty(0, dtype="datetime64[D]")
+    # Bounds again in case the date column could not be pushed down
+    if start is not None:
+        days = days[days >= np.datetime64(pd.Timestamp(start).date(), "D")]
+    if end is not None:
+        days = days[days < np.datetime64(end.date(), "D")]
+    return days
+
+
+def normalize_candles(table) -> pa.Table:
+    """
+    Canonical candle table: lower-case date/open/high/low/close[/volume]
+    columns, naive local-time timestamps and float64 prices, sorted by date.
+
+    Unknown columns are dropped; 'datetime' is renamed to 'date'.
+    """
+    schema = table.schema
+    date_name = date_column(schema)
+    arrays = [_normalize_timestamps(table.column(date_name).combine_chunks())]
+    names = ["date"]
+    for name in PRICE_COLUMNS:
+        arrays.append(table.column(_column(schema, name)).cast(pa.float64()))
+        names.append(name)
+    if "volume" in {field.lower() for field in schema.names}:
+        arrays.append(pc.fill_null(table.column(_column(schema, "volume")), 0).cast(pa.int64(), safe=False))
+        names.append("volume")
+
+    normalized = pa.table(arrays, names=names)
+    return normalized.take(pc.sort_indices(normalized, sort_keys=[("date", "ascending")]))
+
+
+def partition_path(symbol, interval, year, month) -> str:
+    """
+    Hive-style relative path of one month partition.
+    """
+    return f"symbol={symbol}/interval={interval}/year={year:04d}/month={month:02d}/{PARTITION_FILE_NAME}"
+
+
+def write_partitions(path, out_dir, symbol, interval, compression="zstd") -> list:
+    """
+    Rewrite one candle file as sorted month partitions under out_dir.
+
+    Each file holds one month, with row groups aligned to trading days (days
+    are merged only while a group stays under PARTITION_MIN_ROW_GROUP_ROWS),
+    so a replay downloads one small object and decodes one day of it.
+
+    Returns:
+        List of dicts with year, month, relative_path, file_path, rows, start, end
+    """
+    table = normalize_candles(ds.dataset(path, format="parquet").to_table())
+    timestamps = table.column("date").to_numpy()
+    months = timestamps.astype("datetime64[M]")
+    days = timestamps.astype("datetime64[D]")
+
+    partitions = []
+    month_starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]]) if len(months) else np.empty(0, dtype=np.int64)
+    for lo, hi in zip(month_starts, np.r_[month_starts[1:], len(months)]):
+        month = pd.Timestamp(months[lo])
+        relative_path = partition_path(symbol, interval, month.year, month.month)
+        file_path = os.path.join(out_dir, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        with pq.ParquetWriter(file_path, table.schema, compression=compression) as writer:
+            for group_lo, group_hi in _row_groups(days[lo:hi]):
+                writer.write_table(table.slice(lo + group_lo, group_hi - group_lo))
+
+        partitions.append({
+            "year": month.year,
+            "month": month.month,
+            "relative_path": relative_path,
+            "file_path": file_path,
+            "rows": int(hi - lo),
+            "start": pd.Timestamp(timestamps[lo]),
+            "end": pd.Timestamp(timestamps[hi - 1]),
+        })
+    return partitions
+
+
+def _row_groups(days):
+    """
+    (lo, hi) row ranges: whole days, merged up to PARTITION_MIN_ROW_GROUP_ROWS.
+    """
+    day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]).tolist() + [len(days)]
+    lo = 0
+    for hi in day_starts[1:]:
+        if hi - lo >= PARTITION_MIN_ROW_GROUP_ROWS or hi == len(days):
+            yield lo, hi
+            lo = hi
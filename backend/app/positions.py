@@ -0,0 +1,266 @@
+# File: backend/app/positions.py
+
+from datetime import datetime
+
+import numpy as np
+
+ACCOUNTING_METHODS = ("fifo", "average")
+
+
+class PositionBook:
+    """
+    Open lots for any number of symbols, held in NumPy arrays.
+
+    Every fill either extends the open side of a symbol or closes lots on it
+    (FIFO, or against the average cost), and any remainder opens the other
+    side, so partial closes and flips are a single call. Per symbol the book
+    keeps the signed net quantity, the cost basis of the open lots
+    (sum of qty * entry price) and the realized PnL, all updated
+    incrementally on each fill. Unrealized PnL is therefore
+    net_qty * price - cost_basis, which marks a whole tick batch (or a
+    ticks x symbols matrix) to market in one vectorized expression, however
+    many lots are open.
+    """
+
+    def __init__(self, method="fifo", capacity=64):
+        """
+        Args:
+            method: "fifo" or "average" cost accounting
+            capacity: Initial number of lot slots (grows as needed)
+        """
+        if method not in ACCOUNTING_METHODS:
+            raise ValueError(f"Unknown accounting method: {method}")
+        self.method = method
+
+        # Per-symbol state, indexed by self.symbols[symbol]
+        self.symbols = {}
+        self.net_qty = np.zeros(0, dtype=np.int64)
+        self.cost_basis = np.zeros(0, dtype=np.float64)
+        self.realized = np.zeros(0, dtype=np.float64)
+
+        # Open lots, oldest first in [0, n_lots); qty is signed (+long, -short)
+        self.n_lots = 0
+        self.lot_symbol = np.empty(capacity, dtype=np.int32)
+        self.lot_qty = np.empty(capacity, dtype=np.int64)
+        self.lot_price = np.empty(capacity, dtype=np.float64)
+        self.lot_time = np.empty(capacity, dtype="datetime64[us]")
+
+    # =========================
+    # Symbols
+    # =========================
+    def symbol_index(self, symbol) -> int:
+        index = self.symbols.get(symbol)
+        if index is None:
+            index = len(self.symbols)
+            self.symbols[symbol] = index
+            self.net_qty = np.append(self.net_qty, 0)
+            self.cost_basis = np.append(self.cost_basis, 0.0)
+            self.realized = np.append(self.realized, 0.0)
+        return index
+
+    def position(self, symbol) -> int:
+        index = self.symbols.get(symbol)
+        return 0 if index is None else int(self.net_qty[index])
+
+    def average_price(self, symbol) -> float:
+        index = self.symbols.get(symbol)
+        if index is None or self.net_qty[index] == 0:
+            return 0.0
+        return float(self.cost_basis[index] / self.net_qty[index])
+
+    # =========================
+    # Fills
+    # =========================
+    def fill(self, symbol, qty: int, price: float, when=None) -> list:
+        """
+        Apply one fill.
+
+        Args:
+            symbol: Instrument
+            qty: Signed quantity (+buy, -sell)
+            price: Fill price
+            when: Fill time (datetime), defaults to now (UTC)
+
+        Returns:
+            A list of closed lot portions, one dict per portion with
+            direction, entry_price, exit_price, quantity, pnl and entry_time
+        """
+        qty = int(qty)
+        if qty == 0:
+            return []
+        price = float(price)
+        when = np.datetime64(when or datetime.utcnow(), "us")
+        s = self.symbol_index(symbol)
+
+        closed = []
+        net = int(self.net_qty[s])
+        if net != 0 and (net > 0) != (qty > 0):
+            closing = min(abs(qty), abs(net))
+            closed = self._close(s, closing * (1 if net > 0 else -1), price)
+            qty += closing if qty < 0 else -closing
+
+        if qty != 0:
+            self._open(s, qty, price, when)
+        return closed
+
+    def _open(self, s, qty, price, when):
+        if self.method == "average":
+            lot = self._lots_of(s)
+            if len(lot):
+                # Merge into the single average-cost lot, keeping its entry time
+                i = lot[0]
+                total = self.lot_qty[i] + qty
+                self.lot_price[i] = (self.lot_qty[i] * self.lot_price[i] + qty * price) / total
+                self.lot_qty[i] = total
+                self.net_qty[s] += qty
+                self.cost_basis[s] += qty * price
+                return
+
+        self._reserve(1)
+        i = self.n_lots
+        self.lot_symbol[i] = s
+        self.lot_qty[i] = qty
+        self.lot_price[i] = price
+        self.lot_time[i] = when
+        self.n_lots += 1
+
+        self.net_qty[s] += qty
+        self.cost_basis[s] += qty * price
+
+    def _close(self, s, qty, price) -> list:
+        """
+        Close |qty| units of the open side of symbol s (qty has the lots' sign).
+        """
+        lots = self._lots_of(s)  # Oldest first, so this is FIFO order
+        sign = 1 if qty > 0 else -1
+        size = np.abs(self.lot_qty[lots])
+
+        # Units taken from each lot: fill the oldest lots first
+        before = np.cumsum(size) - size
+        take = np.clip(abs(qty) - before, 0, size)
+        hit = take > 0
+        lots, take = lots[hit], take[hit]
+
+        entry = self.lot_price[lots]
+        pnl = (price - entry) * take * sign
+
+        self.lot_qty[lots] -= take * sign
+        self.net_qty[s] -= int(take.sum()) * sign
+        self.cost_basis[s] -= float(np.dot(take, entry)) * sign
+        self.realized[s] += float(pnl.sum())
+        if self.net_qty[s] == 0:
+            self.cost_basis[s] = 0.0  # Drop accumulated float error
+
+        closed = [
+            {
+                "direction": "LONG" if sign > 0 else "SHORT",
+                "entry_price": float(entry[k]),
+                "exit_price": price,
+                "quantity": int(take[k]),
+                "pnl": float(pnl[k]),
+                "entry_time": self.lot_time[lots[k]].astype(datetime),
+            }
+            for k in range(len(lots))
+        ]
+        self._compact()
+        return closed
+
+    def _lots_of(self, s):
+        return np.flatnonzero(self.lot_symbol[:self.n_lots] == s)
+
+    def _compact(self):
+        n = self.n_lots
+        keep = self.lot_qty[:n] != 0
+        if keep.all():
+            return
+        kept = int(keep.sum())
+        for column in (self.lot_symbol, self.lot_qty, self.lot_price, self.lot_time):
+            column[:kept] = column[:n][keep]
+        self.n_lots = kept
+
+    def _reserve(self, extra):
+        needed = self.n_lots + extra
+        capacity = len(self.lot_qty)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        self.lot_symbol = _grow(self.lot_symbol, capacity)
+        self.lot_qty = _grow(self.lot_qty, capacity)
+        self.lot_price = _grow(self.lot_price, capacity)
+        self.lot_time = _grow(self.lot_time, capacity)
+
+    # =========================
+    # Snapshots
+    # =========================
+    def snapshot(self) -> dict:
+        """
+        JSON-serializable state of the book (see from_snapshot).
+        """
+        n = self.n_lots
+        return {
+            "method": self.method,
+            "symbols": sorted(self.symbols, key=self.symbols.get),
+            "net_qty": self.net_qty.tolist(),
+            "cost_basis": self.cost_basis.tolist(),
+            "realized": self.realized.tolist(),
+            "lots": [
+                self.lot_symbol[:n].tolist(),
+                self.lot_qty[:n].tolist(),
+                self.lot_price[:n].tolist(),
+                self.lot_time[:n].astype(np.int64).tolist(),  # Microseconds since epoch
+            ],
+        }
+
+    @classmethod
+    def from_snapshot(cls, state) -> "PositionBook":
+        lot_symbol, lot_qty, lot_price, lot_time = state["lots"]
+        book = cls(state["method"], capacity=max(64, len(lot_qty)))
+        book.symbols = {symbol: i for i, symbol in enumerate(state["symbols"])}
+        book.net_qty = np.array(state["net_qty"], dtype=np.int64)
+        book.cost_basis = np.array(state["cost_basis"], dtype=np.float64)
+        book.realized = np.array(state["realized"], dtype=np.float64)
+
+        n = book.n_lots = len(lot_qty)
+        book.lot_symbol[:n] = lot_symbol
+        book.lot_qty[:n] = lot_qty
+        book.lot_price[:n] = lot_price
+        book.lot_time[:n] = np.array(lot_time, dtype=np.int64).astype("datetime64[us]")
+        return book
+
+    # =========================
+    # Mark-to-market
+    # =========================
+    def unrealized(self, symbol, prices):
+        """
+        Unrealized PnL of one symbol at each price (scalar or array).
+        """
+        index = self.symbols.get(symbol)
+        if index is None:
+            return np.zeros_like(np.asarray(prices, dtype=np.float64))
+        return self.net_qty[index] * np.asarray(prices, dtype=np.float64) - self.cost_basis[index]
+
+    def mark_to_market(self, prices):
+        """
+        Unrealized PnL for every symbol.
+
+        Args:
+            prices: Array whose last axis is indexed like self.symbols,
+                e.g. shape (k,) for one quote per symbol or (n, k) for a
+                batch of n ticks
+
+        Returns:
+            Array of the same shape
+        """
+        return self.net_qty * np.asarray(prices, dtype=np.float64) - self.cost_basis
+
+    def equity(self, prices):
+        """
+        Realized plus unrealized PnL across all symbols (per tick for a batch).
+        """
+        return self.realized.sum() + self.mark_to_market(prices).sum(axis=-1)
+
+
+def _grow(column, capacity):
+    grown = np.empty(capacity, dtype=column.dtype)
+    grown[:len(column)] = column
+    return grown
@@ -0,0 +1,271 @@
+# File: backend/app/replay.py
+
+import asyncio
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .catalog import interval_seconds, next_trading_day, open_market_data
+from .clock import SimulationClock
+from .metrics import REPLAY_ACTUAL_SPEED, REPLAY_SPEED_RATIO, TICKS_STREAMED
+from .sentiment import sentiment_index
+from .tick_cache import tick_cache_key
+
+# --- ROBUST IMPORT FOR SIMULATION ---
+try:
+    from .simulation import TickSynthesizer, derive_seed
+    print("✅ Brownian Bridge Engine Loaded")
+except ImportError:
+    print("⚠️ Warning: simulation.py not found. Using Mock Fallback.")
+    def derive_seed(session_id, symbol, date):
+        return None
+
+    class TickSynthesizer:
+        def __init__(self, seed=None):
+            pass
+
+        def generate_ticks(self, o, h, l, c, num_ticks=60):
+            return [o] * num_ticks
+
+        def generate_day(self, o, h, l, c, num_ticks=60, drift=None):
+            return np.repeat(np.asarray(o, dtype=np.float64)[:, None], num_ticks, axis=1)
+
+
+TICKS_PER_CANDLE = 60
+SYNTHETIC_CANDLES = 375  # One NSE session of 1-minute candles
+EPOCH = pd.Timestamp(0)
+
+
+class Replay:
+    """
+    The tick stream of one replay window, paced by a SimulationClock.
+
+    Holds the flat synthesized ticks, the epoch of every candle and a cursor
+    to the next tick. Both private sessions and shared rooms stream from a
+    Replay; neither owns any pacing or indexing logic of its own.
+    """
+
+    def __init__(self, symbol, ticks, candle_epochs, speed=1.0, day=None, seed=None, tick_seconds=1.0,
+                 target_date=None, cache_key=None):
+        """
+        Args:
+            symbol: Instrument symbol
+            ticks: Flat float64 array of tick prices
+            candle_epochs: Epoch seconds of each candle (TICKS_PER_CANDLE ticks each)
+            speed: Clock speed, None for max speed
+            day: DaySlice the ticks were synthesized for (None for synthetic data)
+            seed: Seed the ticks were synthesized with
+            tick_seconds: Simulated seconds between ticks (candle interval
+                / TICKS_PER_CANDLE)
+            target_date: Date or intraday start the replay was built for
+            cache_key: Tick cache key of the synthesized day (None for
+                synthetic data, which cannot be rebuilt)
+        """
+        self.symbol = symbol
+        self.ticks = ticks
+        self.candle_epochs = candle_epochs
+        self.day = day
+        self.seed = seed
+        self.tick_seconds = tick_seconds
+        self.target_date = target_date
+        self.cache_key = cache_key
+        self.cursor = 0
+        self.clock = SimulationClock(speed, tick_seconds)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    @property
+    def finished(self) -> bool:
+        return self.cursor >= len(self.ticks)
+
+    def rewind(self):
+        self.seek(0)
+
+    def seek(self, cursor):
+        """
+        Continue from tick `cursor`, due right now.
+        """
+        self.cursor = min(max(int(cursor), 0), len(self.ticks))
+        self.clock.reset(self.cursor)
+
+    def set_speed(self, speed):
+        self.clock.set_speed(speed, self.cursor)
+
+    def next_frame_time(self) -> float:
+        return self.clock.next_frame_time(self.cursor)
+
+    def take_frame(self):
+        """
+        Take every tick that is due now and advance the cursor.
+
+        Returns:
+            (epochs, prices) arrays, or None if nothing is due yet
+        """
+        count = min(self.clock.due(self.cursor), len(self.ticks) - self.cursor)
+        if count <= 0:
+            return None
+        first = self.cursor
+        indices = np.arange(first, first + count)
+        epochs = self.candle_epochs[indices // TICKS_PER_CANDLE] + (indices % TICKS_PER_CANDLE) * self.tick_seconds
+
+        self.cursor = first + count
+        self.clock.mark_frame()
+        self._observe_speed(count)
+        return epochs, self.ticks[first:first + count]
+
+    def _observe_speed(self, count):
+        TICKS_STREAMED.inc(count)
+        actual = self.clock.actual_speed(self.cursor)
+        if actual is None:
+            return
+        REPLAY_ACTUAL_SPEED.observe(actual)
+        if not self.clock.is_max_speed:
+            REPLAY_SPEED_RATIO.observe(actual / self.clock.speed)
+
+
+async def load_replay(store, tick_cache, session_id, target_date=None, speed=1.0, sentiment_drift=False) -> Replay:
+    """
+    Build a Replay for a START request.
+
+    Args:
+        store: Shared MarketDataStore, or None for synthetic data
+        tick_cache: Shared TickCache for synthesized days
+        session_id: Seeds the synthesizer together with symbol and date
+        target_date: A date ("2024-01-15") or an intraday start
+            ("2024-01-15T11:30"); defaults to the first day in the store
+        speed: Clock speed, None for max speed
+        sentiment_drift: Bias the synthesized ticks by the news sentiment
+            index (app/sentiment.py) at each candle
+
+    Raises:
+        LookupError: If the store has no data for target_date
+    """
+    if store is None:
+        # Flat synthetic session starting now
+        candles = np.full(SYNTHETIC_CANDLES, 21500.0)
+        ticks = TickSynthesizer().generate_day(
+            candles, candles + 10, candles - 10, candles + 5, num_ticks=TICKS_PER_CANDLE
+        ).reshape(-1)
+        start = (pd.Timestamp.now().floor("min") - EPOCH).total_seconds()
+        return Replay("NIFTY 50", ticks, start + 60.0 * np.arange(SYNTHETIC_CANDLES), speed)
+
+    if not target_date:
+        target_date = store.first_date
+    selected_day, full_day, day_epochs = _resolve_day(store, target_date)
+    print(f"✅ Found {len(selected_day)} records for {target_date}")
+
+    # Synthesize the whole day in one vectorized pass. The seed depends only on
+    # (session, symbol, date), so the same replay always yields the same ticks,
+    # whatever intraday time it starts from, and can be served from the tick cache.
+    seed = derive_seed(session_id, store.symbol, full_day.date)
+
+    dataset = f"{store.symbol}:{store.interval}"
+    drift = None
+    if sentiment_drift:
+        drift = sentiment_index.drift(store.symbol, day_epochs)
+        if drift.any():
+            # Biased ticks are cached apart from plain ones (and per index state)
+            dataset += ":s" + hashlib.blake2b(drift.tobytes(), digest_size=6).hexdigest()
+        else:
+            drift = None
+
+    cache_key = tick_cache_key(dataset, full_day.date, seed, TICKS_PER_CANDLE)
+    full_ticks = await asyncio.to_thread(
+        tick_cache.get_or_create,
+        cache_key,
+        lambda: TickSynthesizer(seed).generate_day(
+            full_day.open, full_day.high, full_day.low, full_day.close,
+            num_ticks=TICKS_PER_CANDLE, drift=drift,
+        ),
+    )
+    return _build_replay(store, selected_day, full_day, day_epochs, full_ticks, speed, seed, target_date, cache_key)
+
+
+async def load_next_day(replay, interval, tick_cache, session_id, sentiment_drift=False):
+    """
+    Build the replay that follows `replay` once it has finished: the next
+    trading day of its dataset, or the first day again at the end of the data.
+
+    Args:
+        replay: The finished Replay (its speed carries over)
+        interval: Candle interval of its dataset
+        tick_cache, session_id, sentiment_drift: As for load_replay
+
+    Returns:
+        (store, replay), or None for synthetic data (callers rewind instead)
+    """
+    if replay.day is None:
+        return None
+    day = await asyncio.to_thread(next_trading_day, replay.symbol, interval, replay.day.date)
+    store = await asyncio.to_thread(open_market_data, replay.symbol, interval, day)
+    if store is None:
+        return None
+    return store, await load_replay(store, tick_cache, session_id, day, replay.clock.speed, sentiment_drift)
+
+
+async def resume_replay(store, tick_cache, target_date, seed, cache_key, cursor, speed=1.0) -> Replay | None:
+    """
+    Rebuild a replay from a session snapshot (app/snapshots.py), at tick `cursor`.
+
+    The day's ticks are read back from the tick cache under the snapshot's
+    key, so nothing is resynthesized. On a cache miss a plain replay is
+    resynthesized from its seed (same ticks); a sentiment-biased one cannot
+    be, since the index has moved on since.
+
+    Returns:
+        The Replay, or None if it cannot be rebuilt
+    """
+    if store is None or cache_key is None:
+        return None
+    selected_day, full_day, day_epochs = _resolve_day(store, target_date)
+
+    full_ticks = await asyncio.to_thread(tick_cache.get, cache_key)
+    if full_ticks is None:
+        if cache_key != tick_cache_key(f"{store.symbol}:{store.interval}", full_day.date, seed, TICKS_PER_CANDLE):
+            return None
+        full_ticks = await asyncio.to_thread(
+            tick_cache.get_or_create,
+            cache_key,
+            lambda: TickSynthesizer(seed).generate_day(
+                full_day.open, full_day.high, full_day.low, full_day.close, num_ticks=TICKS_PER_CANDLE
+            ),
+        )
+
+    replay = _build_replay(store, selected_day, full_day, day_epochs, full_ticks, speed, seed, target_date, cache_key)
+    replay.seek(cursor)
+    return replay
+
+
+def _resolve_day(store, target_date):
+    """
+    Returns:
+        (selected window, full trading day, epoch seconds of the day's candles)
+
+    Raises:
+        LookupError: If the store has no data for target_date
+    """
+    selected_day = store.window(target_date)
+    if selected_day is None:
+        raise LookupError(f"No data found for date: {target_date}")
+    full_day = store.day(selected_day.date)
+    day_epochs = (full_day.timestamps - EPOCH.to_datetime64()) / np.timedelta64(1, "s")
+    return selected_day, full_day, day_epochs
+
+
+def replay_tick_seconds(store) -> float:
+    """
+    Simulated seconds between the ticks of a replay of store (1 for synthetic data).
+    """
+    if store is None:
+        return 1.0
+    return interval_seconds(store.interval) / TICKS_PER_CANDLE
+
+
+def _build_replay(store, selected_day, full_day, day_epochs, full_ticks, speed, seed, target_date, cache_key):
+    offset = selected_day.start_row - full_day.start_row
+    ticks = full_ticks[offset:].reshape(-1)
+    candle_epochs = day_epochs[offset:]
+    return Replay(store.symbol, ticks, candle_epochs, speed, day=selected_day, seed=seed,
+                  tick_seconds=replay_tick_seconds(store), target_date=target_date, cache_key=cache_key)
@@ -0,0 +1,299 @@
+# File: backend/app/rooms.py
+
+import asyncio
+import datetime
+import time
+
+from .bus import ROOM_OWNER_TTL, message_bus
+from .catalog import DEFAULT_INTERVAL, DEFAULT_SYMBOL, interval_seconds, open_market_data
+from .metrics import ROOM_SUBSCRIBERS, ROOMS_ACTIVE
+from .replay import TICKS_PER_CANDLE, load_next_day, load_replay
+from .wire import EPOCH_DT, SharedFrame
+
+ROOM_MEMBER_CHECK_SECONDS = 5.0  # How often an owner with no local subscribers checks other workers
+
+
+class Room:
+    """
+    A replay shared by many sessions (a classroom or a competition).
+
+    One producer task paces and slices the ticks once and fans every frame
+    out to all subscribers as a SharedFrame, which is encoded at most once
+    per wire format. Subscribers keep their own OrderManager and receive
+    their PnL as a per-session overlay, so the per-replay cost is O(1) in
+    the number of users.
+
+    With several workers, exactly one of them owns the room (see
+    app/bus.py): it runs this producer and also publishes every frame, and
+    the others relay those frames to their own subscribers (RemoteRoom).
+    The owner keeps producing while any worker still has members.
+    """
+
+    owner = True
+
+    def __init__(self, room_id, replay, tick_cache, interval=DEFAULT_INTERVAL):
+        self.room_id = room_id
+        self.replay = replay
+        self.tick_cache = tick_cache
+        self.interval = interval
+        self.subscribers = set()
+        self.task = None
+        self._members_checked_at = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        ROOMS_ACTIVE.inc()
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+            ROOMS_ACTIVE.dec()
+
+    async def run(self):
+        while True:
+            await self._produce()
+
+            # Nobody left on any worker, unless a session joined during the
+            # last member check (join adds subscribers under the same lock)
+            async with room_registry._lock:
+                if self.subscribers:
+                    continue
+                if room_registry.rooms.get(self.room_id) is self:
+                    del room_registry.rooms[self.room_id]
+                    ROOMS_ACTIVE.dec()
+                    self.task = None
+                    await message_bus.release_room(self.room_id, close=True)
+                    print(f"🏫 Room {self.room_id} closed")
+                return
+
+    async def _produce(self):
+        """
+        Pace and fan out frames while any worker has members.
+        """
+        replay = self.replay
+        while self.subscribers or await self._has_remote_members():
+            if self.subscribers:
+                self._members_checked_at = None
+            if replay.finished:
+                replay = await self._next_day(replay)
+
+            delay = replay.next_frame_time() - time.monotonic()
+            await asyncio.sleep(max(delay, 0))
+
+            frame = replay.take_frame()
+            if frame is None:
+                continue
+
+            epochs, prices = frame
+            shared = SharedFrame(replay.symbol, epochs, prices)
+            for session in list(self.subscribers):
+                session.on_room_frame(shared)
+            await message_bus.publish_frame(self.room_id, replay.symbol, epochs, prices)
+
+    async def _next_day(self, replay):
+        """
+        The replay to continue with once `replay` has finished: the next
+        trading day, or the first day again at the end of the data.
+        """
+        try:
+            loaded = await load_next_day(replay, self.interval, self.tick_cache, f"room:{self.room_id}")
+        except Exception as e:
+            print(f"⚠️ Room {self.room_id}: next trading day failed to load: {e}")
+            loaded = None
+        if loaded is None:
+            print(f"🏁 Room {self.room_id}: End of Data. Restarting...")
+            replay.rewind()
+            return replay
+        _, self.replay = loaded
+        print(f"🏁 Room {self.room_id}: end of {replay.day.date}, continuing with {self.replay.day.date}")
+        return self.replay
+
+    async def _has_remote_members(self) -> bool:
+        """
+        Whether other workers still have members (asked every few seconds).
+        """
+        if not message_bus.enabled:
+            return False
+        now = time.monotonic()
+        if self._members_checked_at is None:
+            # Grace period: members leaving elsewhere are removed asynchronously
+            self._members_checked_at = now
+            return True
+        if now - self._members_checked_at < ROOM_MEMBER_CHECK_SECONDS:
+            return True
+        self._members_checked_at = now
+        if await message_bus.member_count(self.room_id) > 0:
+            return True
+        self._members_checked_at = None
+        return False
+
+
+class RemoteRoom:
+    """
+    A room owned by another worker: its published frames are relayed to
+    this worker's subscribers, so the producer's cost does not grow with
+    the number of workers serving the room.
+
+    If the owner disappears (its claim expires without frames arriving),
+    this worker takes the room over and resumes it from the last frame seen,
+    reloading the dataset named in the room settings (the joining session's
+    own store may be for another symbol or day).
+    """
+
+    owner = False
+
+    def __init__(self, room_id, tick_cache):
+        self.room_id = room_id
+        self.tick_cache = tick_cache
+        self.subscribers = set()
+        self.task = None
+        self.last_epoch = None
+        self.last_frame_at = time.monotonic()
+
+    def on_frame(self, symbol, epochs, prices):
+        self.last_epoch = float(epochs[-1])
+        self.last_frame_at = time.monotonic()
+        shared = SharedFrame(symbol, epochs, prices)
+        for session in list(self.subscribers):
+            session.on_room_frame(shared)
+
+    def start(self):
+        self.task = asyncio.create_task(self.watch_owner())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        message_bus.background(message_bus.unsubscribe_room(self.room_id))
+
+    async def watch_owner(self):
+        while self.subscribers:
+            await asyncio.sleep(ROOM_OWNER_TTL / 2)
+            if time.monotonic() - self.last_frame_at < ROOM_OWNER_TTL:
+                continue
+            try:
+                if await message_bus.room_owner(self.room_id) is None:
+                    await room_registry.take_over(self)
+                    return
+            except Exception as e:
+                # Keep watching: a Redis error must not end takeover monitoring
+                print(f"⚠️ Room {self.room_id} owner check failed: {e}")
+
+
+class RoomRegistry:
+    """
+    Process-wide map of room_id -> Room.
+
+    The first session to join a room decides its date and speed; later
+    sessions join the stream wherever it currently is. A room stops when its
+    last subscriber leaves.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+        self._lock = asyncio.Lock()
+
+    async def join(self, room_id, session, store, tick_cache, target_date=None, speed=1.0):
+        """
+        Join a room on this worker, opening it here or relaying it from the
+        worker that owns it.
+
+        Raises:
+            LookupError: If the room does not exist yet and there is no data
+                for target_date
+        """
+        async with self._lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                settings = {
+                    "symbol": getattr(store, "symbol", None),
+                    "interval": getattr(store, "interval", None),
+                    "date": target_date,
+                    "speed": speed,
+                }
+                if await message_bus.claim_room(room_id, settings):
+                    try:
+                        room = await self._open(room_id, store, tick_cache, target_date, speed)
+                    except Exception:
+                        await message_bus.release_room(room_id, close=True)
+                        raise
+                else:
+                    room = RemoteRoom(room_id, tick_cache)
+                    await message_bus.subscribe_room(room_id, room.on_frame)
+                    self.rooms[room_id] = room
+                    room.start()
+                    print(f"🏫 Room {room_id} relayed from {await message_bus.room_owner(room_id)}")
+            room.subscribers.add(session)
+
+        await message_bus.add_member(room_id, session.session_id)
+        ROOM_SUBSCRIBERS.inc()
+        print(f"👥 Room {room_id}: {len(room.subscribers)} subscribers")
+        return room
+
+    async def _open(self, room_id, store, tick_cache, target_date, speed) -> Room:
+        # Rooms are seeded by their id, so every run of a room is identical
+        replay = await load_replay(store, tick_cache, f"room:{room_id}", target_date, speed)
+        room = Room(room_id, replay, tick_cache, getattr(store, "interval", DEFAULT_INTERVAL))
+        self.rooms[room_id] = room
+        room.start()
+        print(f"🏫 Room {room_id} opened")
+        return room
+
+    async def take_over(self, remote):
+        """
+        Promote a RemoteRoom whose owner died, resuming after its last frame.
+        """
+        async with self._lock:
+            if self.rooms.get(remote.room_id) is not remote:
+                return
+            settings = await message_bus.room_settings(remote.room_id)
+            if not await message_bus.claim_room(remote.room_id, settings):
+                return
+            speed = settings.get("speed")
+            speed = None if speed in (None, "", "None") else float(speed)
+            symbol = settings.get("symbol") or DEFAULT_SYMBOL
+            interval = settings.get("interval") or DEFAULT_INTERVAL
+            resume_at = settings.get("date") or None
+            if remote.last_epoch is not None:
+                # One tick past the last frame seen: the store seeks to the
+                # first candle at or after it, i.e. the next candle
+                tick_seconds = interval_seconds(interval) / TICKS_PER_CANDLE
+                resume_at = (EPOCH_DT + datetime.timedelta(seconds=remote.last_epoch + tick_seconds)).isoformat()
+            try:
+                store = await asyncio.to_thread(open_market_data, symbol, interval, resume_at)
+                replay = await load_replay(store, remote.tick_cache, f"room:{remote.room_id}", resume_at, speed)
+            except Exception as e:
+                print(f"❌ Room {remote.room_id} takeover failed: {e}")
+                await message_bus.release_room(remote.room_id)
+                return
+            await message_bus.unsubscribe_room(remote.room_id)
+            room = Room(remote.room_id, replay, remote.tick_cache, interval)
+            room.subscribers = remote.subscribers
+            for session in room.subscribers:
+                session.room = room
+            self.rooms[remote.room_id] = room
+            room.start()
+            print(f"🏫 Room {remote.room_id} taken over by this worker")
+
+    def leave(self, room, session):
+        if session not in room.subscribers:
+            return
+        room.subscribers.discard(session)
+        ROOM_SUBSCRIBERS.dec()
+        message_bus.background(message_bus.remove_member(room.room_id, session.session_id))
+
+        if room.subscribers or self.rooms.get(room.room_id) is not room:
+            return
+        if room.owner and message_bus.enabled:
+            # The producer closes the room itself once no worker has members
+            return
+        room.stop()
+        del self.rooms[room.room_id]
+        if room.owner:
+            print(f"🏫 Room {room.room_id} closed")
+        else:
+            print(f"🏫 Room {room.room_id} no longer relayed")
+
+
+room_registry = RoomRegistry()
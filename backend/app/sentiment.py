@@ -0,0 +1,196 @@
+# File: backend/app/sentiment.py
+#
+# Per-symbol, per-minute news sentiment index built from news_events (written
+# by workers/news_worker.py). Each symbol keeps dense per-minute arrays plus
+# their prefix sums, so the rolling mean and count at any candle is two array
+# reads. A background task pulls only new rows (id > last seen); the stream
+# itself never touches Postgres.
+
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from .catalog import catalog_key
+from .database import engine
+from .metrics import SENTIMENT_EVENTS
+
+SENTIMENT_WINDOW_MINUTES = int(os.getenv("SENTIMENT_WINDOW_MINUTES", "15"))  # Rolling mean window
+SENTIMENT_REFRESH_SECONDS = float(os.getenv("SENTIMENT_REFRESH_SECONDS", "30"))
+SENTIMENT_TIMEZONE = os.getenv("SENTIMENT_TIMEZONE", "Asia/Kolkata")  # Wall clock of the candle data
+SENTIMENT_DRIFT_SCALE = float(os.getenv("SENTIMENT_DRIFT_SCALE", "0.5"))  # Tick bias per unit of sentiment
+SENTIMENT_FETCH_ROWS = 50_000
+
+MARKET = "*"  # Events without a symbol apply to every symbol
+
+
+class MinuteSeries:
+    """
+    Immutable dense per-minute sums/counts of one symbol's sentiment scores.
+
+    Attributes:
+        base: Epoch minute of index 0
+        sums, counts: Score sum and event count per minute
+        csum, ccount: Prefix sums (length n + 1) for O(1) window queries
+    """
+
+    __slots__ = ("base", "sums", "counts", "csum", "ccount")
+
+    def __init__(self, base, sums, counts, csum=None, ccount=None):
+        self.base = base
+        self.sums = sums
+        self.counts = counts
+        self.csum = csum if csum is not None else np.concatenate(([0.0], np.cumsum(sums)))
+        self.ccount = ccount if ccount is not None else np.concatenate(([0], np.cumsum(counts)))
+
+    def merged(self, minutes, scores) -> "MinuteSeries":
+        """
+        A new series with the events added (the prefix sums are only
+        recomputed from the earliest changed minute onwards).
+        """
+        lo, hi = int(minutes.min()), int(minutes.max())
+        base = min(self.base, lo)
+        size = max(self.base + len(self.sums), hi + 1) - base
+        shift = self.base - base
+
+        sums = np.zeros(size)
+        counts = np.zeros(size, dtype=np.int64)
+        sums[shift:shift + len(self.sums)] = self.sums
+        counts[shift:shift + len(self.counts)] = self.counts
+        np.add.at(sums, minutes - base, scores)
+        np.add.at(counts, minutes - base, 1)
+
+        if shift:
+            return MinuteSeries(base, sums, counts)
+        first = lo - base
+        csum = np.empty(size + 1)
+        ccount = np.empty(size + 1, dtype=np.int64)
+        csum[:first + 1] = self.csum[:first + 1]
+        ccount[:first + 1] = self.ccount[:first + 1]
+        csum[first + 1:] = csum[first] + np.cumsum(sums[first:])
+        ccount[first + 1:] = ccount[first] + np.cumsum(counts[first:])
+        return MinuteSeries(base, sums, counts, csum, ccount)
+
+    def window(self, minutes, window):
+        """
+        Score sums and counts over the `window` minutes ending at each minute.
+        """
+        n = len(self.sums)
+        end = np.clip(minutes - self.base + 1, 0, n)
+        start = np.clip(minutes - self.base + 1 - window, 0, n)
+        return self.csum[end] - self.csum[start], self.ccount[end] - self.ccount[start]
+
+
+class SentimentIndex:
+    """
+    Rolling news sentiment per symbol and minute.
+
+    Keyed by catalog symbol (events with no symbol are market-wide and
+    count towards every symbol). Minutes are in the candle data's wall
+    clock (SENTIMENT_TIMEZONE), the same epoch convention as the tick stream.
+    """
+
+    def __init__(self, db_engine=None, window=SENTIMENT_WINDOW_MINUTES):
+        self.engine = db_engine or engine
+        self.window = window
+        self.series = {}  # key -> MinuteSeries, replaced (never mutated) on refresh
+        self.last_id = 0
+        self._refresh_lock = threading.Lock()
+
+    def add(self, symbols, created_at, scores):
+        """
+        Fold events into the index.
+
+        Args:
+            symbols: Symbol of each event (None for market-wide)
+            created_at: UTC timestamps of the events
+            scores: VADER compound scores
+        """
+        wall = pd.DatetimeIndex(pd.to_datetime(created_at)).tz_localize("UTC").tz_convert(SENTIMENT_TIMEZONE)
+        minutes = wall.tz_localize(None).asi8 // 60_000_000_000
+        keys = np.array([MARKET if s is None else catalog_key(s) for s in symbols], dtype=object)
+        scores = np.asarray(scores, dtype=np.float64)
+
+        for key in np.unique(keys):
+            mask = keys == key
+            current = self.series.get(key)
+            if current is None:
+                current = MinuteSeries(int(minutes[mask].min()), np.zeros(0), np.zeros(0, dtype=np.int64))
+            self.series[key] = current.merged(minutes[mask], scores[mask])
+
+    def refresh(self) -> int:
+        """
+        Pull news_events rows newer than the last seen id (blocking).
+
+        Returns:
+            Number of new events
+        """
+        with self._refresh_lock:
+            total = 0
+            while True:
+                try:
+                    with self.engine.connect() as conn:
+                        rows = conn.execute(text("""
+                            SELECT id, symbol, sentiment_score, created_at
+                            FROM news_events
+                            WHERE id > :last_id AND sentiment_score IS NOT NULL AND created_at IS NOT NULL
+                            ORDER BY id
+                            LIMIT :limit
+                        """), {"last_id": self.last_id, "limit": SENTIMENT_FETCH_ROWS}).all()
+                except Exception as e:
+                    print(f"⚠️ Sentiment refresh failed: {e}")
+                    return total
+                if not rows:
+                    return total
+
+                ids, symbols, scores, created_at = zip(*rows)
+                self.add(symbols, created_at, scores)
+                self.last_id = ids[-1]
+                total += len(rows)
+                SENTIMENT_EVENTS.inc(len(rows))
+                if len(rows) < SENTIMENT_FETCH_ROWS:
+                    return total
+
+    def lookup(self, symbol, epochs):
+        """
+        Rolling mean and count at each epoch (seconds, wall clock).
+
+        Returns:
+            (mean, count) arrays; mean is NaN where the window has no events
+        """
+        minutes = np.asarray(epochs, dtype=np.float64) // 60
+        minutes = minutes.astype(np.int64)
+        total = np.zeros(len(minutes))
+        count = np.zeros(len(minutes), dtype=np.int64)
+        for key in (catalog_key(symbol), MARKET):
+            series = self.series.get(key)
+            if series is not None:
+                s, c = series.window(minutes, self.window)
+                total += s
+                count += c
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, total / count, np.nan)
+        return mean, count
+
+    def drift(self, symbol, epochs, scale=SENTIMENT_DRIFT_SCALE) -> np.ndarray:
+        """
+        Per-candle drift for TickSynthesizer.generate_day (0 without news).
+        """
+        mean, _ = self.lookup(symbol, epochs)
+        return np.nan_to_num(mean, nan=0.0) * scale
+
+    async def run(self, interval=SENTIMENT_REFRESH_SECONDS):
+        """
+        Background refresh loop (started with the app).
+        """
+        while True:
+            added = await asyncio.to_thread(self.refresh)
+            if added:
+                print(f"📰 Sentiment index: +{added} events")
+            await asyncio.sleep(interval)
+
+
+sentiment_index = SentimentIndex()
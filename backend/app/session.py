@@ -0,0 +1,626 @@
+# File: backend/app/session.py
+
+import asyncio
+import datetime
+import json
+import math
+import secrets
+import time
+import uuid
+
+import numpy as np
+from fastapi import WebSocketDisconnect
+
+from .bus import message_bus
+from .catalog import DEFAULT_INTERVAL, DEFAULT_SYMBOL, open_market_data
+from .clock import SimulationClock
+from .metrics import SESSION_RESUME_SECONDS, SESSION_RESUMES
+from .oms import OrderManager
+from .outbound import OutboundBuffer
+from .replay import TICKS_PER_CANDLE, load_next_day, load_replay, replay_tick_seconds, resume_replay
+from .rooms import room_registry
+from .sentiment import sentiment_index
+from .snapshots import SNAPSHOT_SECONDS, session_snapshots
+from .wire import EPOCH_DT
+
+
+class TickerSession:
+    """
+    One /ws/ticker connection.
+
+    The session runs as three tasks: a reader that parses incoming commands
+    into an asyncio queue, a writer (the streaming clock) that drains the
+    queue between ticks, and a sender that drains the bounded OutboundBuffer
+    to the socket. The writer never polls the socket, so an idle session
+    costs no CPU, a BUY/SELL is filled on the very next tick, and a slow
+    client can only ever fill its own bounded buffer.
+
+    A session either streams its own Replay or subscribes to a shared Room
+    (START with a "room" id), in which case the room's producer pushes
+    frames and the session only applies its own orders and PnL overlay.
+
+    Once started, a session is identified by a resume token (sent in a
+    SESSION message) and snapshots its state every SNAPSHOT_SECONDS (see
+    app/snapshots.py); connecting with ?resume=<token> picks the stream
+    up at the first tick the previous connection had not received.
+    """
+
+    def __init__(self, websocket, tick_cache, wire_format="json", symbol=DEFAULT_SYMBOL, interval=DEFAULT_INTERVAL,
+                 sentiment=False, resume_token=None):
+        """
+        Args:
+            websocket: Accepted WebSocket connection
+            tick_cache: Shared TickCache for synthesized days
+            wire_format: "json" or "binary" (see app/wire.py)
+            symbol, interval: Dataset replayed unless START names another
+            sentiment: Send SENTIMENT messages (rolling news sentiment) as
+                the stream crosses each minute, unless START overrides it
+            resume_token: Token of an earlier session to resume
+        """
+        self.websocket = websocket
+        self.session_id = uuid.uuid4().hex
+        self.symbol = symbol
+        self.interval = interval
+        self.store = None  # Shared MarketDataStore, resolved through the catalog on START
+        self.tick_cache = tick_cache
+        self.wire_format = wire_format
+        self.commands = asyncio.Queue()
+
+        # Internal State
+        self.oms = OrderManager(symbol)
+        self.last_tick_price = 21500.0  # Default value to prevent errors before stream starts
+        self.replay = None  # Private replay, when streaming alone
+        self.room = None    # Shared room, when subscribed to one
+        self.sentiment = sentiment
+        self.sentiment_drift = False  # Replay ticks biased by the news sentiment index
+        self._sentiment_minute = None  # Last minute a SENTIMENT message was sent for
+
+        # Resume state (app/snapshots.py)
+        self.resume_token = resume_token
+        self.token = secrets.token_urlsafe(16)
+        self.started = False
+        self._snapshot_seq = 0
+        self._next_snapshot = 0.0
+        self._snapshot_task = None
+        self._oms_cursor = 0  # After a resume: ticks before this were already applied to the OMS
+        self._ended = asyncio.Event()
+        self._superseded = False  # Ended by a reconnect resuming this token
+
+        self.outbound = OutboundBuffer(websocket, symbol, wire_format)
+
+    async def run(self):
+        """
+        Serve the connection until the client disconnects.
+        """
+        await message_bus.register_session(
+            self, symbol=self.symbol, interval=self.interval, wire_format=self.wire_format
+        )
+        if self.resume_token:
+            await self.resume(self.resume_token)
+        reader = asyncio.create_task(self._read_commands())
+        sender = asyncio.create_task(self.outbound.run())
+        writer = asyncio.create_task(self._stream())
+        try:
+            # The writer ends on disconnect; the sender ends if a send fails
+            done, _ = await asyncio.wait({writer, sender}, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in (reader, sender, writer):
+                task.cancel()
+            await self._park()
+            self._leave_room()
+            await message_bus.unregister_session(self)
+            if self._superseded:
+                try:
+                    await self.websocket.close(code=4001, reason="Session resumed elsewhere")
+                except Exception:
+                    pass
+            self._ended.set()
+            print(f"📊 Session stats: {self.outbound.stats()}")
+
+    async def end(self):
+        """
+        Stop this session because a reconnect is resuming its token: the
+        writer stops as on a disconnect, the state is parked, and the old
+        socket is closed.
+        """
+        self._superseded = True
+        self.commands.put_nowait(None)
+        await self._ended.wait()
+
+    # =========================
+    # Reader task
+    # =========================
+    async def _read_commands(self):
+        try:
+            while True:
+                data = await self.websocket.receive_text()
+                try:
+                    message = json.loads(data)
+                except ValueError:
+                    print(f"⚠️ Ignoring malformed command: {data[:100]}")
+                    continue
+                await self.commands.put(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Sentinel: tells the writer the client is gone
+            self.commands.put_nowait(None)
+
+    # =========================
+    # Command handling
+    # =========================
+    async def handle_command(self, message):
+        command = message.get("command")
+
+        if command == "START":
+            await self.start(message)
+
+        elif command == "SPEED":
+            if self.replay is not None:
+                speed = self._requested_speed(message, self.replay.tick_seconds)
+                if speed is not False:
+                    self.replay.set_speed(speed)
+
+        elif command == "STATS":
+            self.outbound.put_message({"type": "STATS", "data": {**self.outbound.stats(), "oms": self.oms.summary()}})
+
+        # --- OMS INTEGRATION ---
+        elif command in ("BUY", "SELL"):
+            self._place_order(command, message)
+            self._next_snapshot = 0.0  # Snapshot order state with the next frame
+
+        elif command == "OCO":
+            self._place_oco(message)
+            self._next_snapshot = 0.0
+
+        elif command == "CANCEL":
+            cancelled = self.oms.cancel_order(message.get("order_id"))
+            self.outbound.put_message({"type": "CANCELLED", "order_id": message.get("order_id"), "ok": cancelled})
+            self._next_snapshot = 0.0
+
+        elif command == "ORDERS":
+            self.outbound.put_message({"type": "ORDERS", "data": self.oms.open_orders()})
+
+    def _place_order(self, side, message):
+        """
+        BUY/SELL: MARKET by default, or a resting LIMIT/STOP at "price".
+        With "stop_loss"/"take_profit" the order is a bracket entry.
+        """
+        order_type = str(message.get("order_type", "MARKET")).upper()
+        try:
+            qty = int(message.get("qty", 50))
+            stop_loss = _optional_price(message.get("stop_loss"))
+            take_profit = _optional_price(message.get("take_profit"))
+
+            if order_type == "MARKET":
+                execute = self.oms.buy if side == "BUY" else self.oms.sell
+                execute(self.last_tick_price, qty=qty, stop_loss=stop_loss, take_profit=take_profit)
+                self._send_order_ack(side)
+                return
+
+            order = self.oms.place_order(1 if side == "BUY" else -1, order_type, float(message["price"]), qty,
+                                         stop_loss=stop_loss, take_profit=take_profit)
+        except (KeyError, TypeError, ValueError) as e:
+            self.outbound.put_message({"type": "ERROR", "message": f"Invalid {side} order: {e}"})
+            return
+        self.outbound.put_message({"type": "ORDER_ACCEPTED", "data": order.to_dict()})
+
+    def _place_oco(self, message):
+        """
+        OCO: {"side", "qty", "legs": [{"order_type", "price"}, ...]}
+        """
+        try:
+            side = 1 if message["side"] == "BUY" else -1
+            qty = int(message.get("qty", 50))
+            legs = [
+                {"side": side, "order_type": str(leg["order_type"]).upper(), "price": float(leg["price"]), "qty": qty}
+                for leg in message["legs"]
+            ]
+            orders = self.oms.place_oco(legs)
+        except (KeyError, TypeError, ValueError) as e:
+            self.outbound.put_message({"type": "ERROR", "message": f"Invalid OCO order: {e}"})
+            return
+        self.outbound.put_message({"type": "ORDER_ACCEPTED", "data": [order.to_dict() for order in orders]})
+
+    def _send_order_ack(self, side):
+        self.outbound.put_message({
+            "type": "ORDER",
+            "side": side,
+            "price": round(self.last_tick_price, 2),
+            "position": self.oms.position,
+            "realized_pnl": round(self.oms.realized_pnl, 2),
+        })
+
+    def _send_fills(self, fills):
+        for fill in fills:
+            self.outbound.put_message({"type": "ORDER", **fill, "position": self.oms.position})
+
+    def _send_sentiment(self, epochs):
+        """
+        SENTIMENT message when a frame reaches a new minute (one index
+        lookup per minute, no database access).
+        """
+        if not self.sentiment or not len(epochs):
+            return
+        epoch = float(epochs[-1])
+        minute = int(epoch // 60)
+        if minute == self._sentiment_minute:
+            return
+        self._sentiment_minute = minute
+        mean, count = sentiment_index.lookup(self.oms.symbol, [epoch])
+        self.outbound.put_latest("SENTIMENT", {
+            "type": "SENTIMENT",
+            "symbol": self.oms.symbol,
+            "timestamp": (EPOCH_DT + datetime.timedelta(seconds=minute * 60)).isoformat(),
+            "mean": None if math.isnan(mean[0]) else round(float(mean[0]), 4),
+            "count": int(count[0]),
+        })
+
+    @staticmethod
+    def _requested_speed(message, seconds_per_tick):
+        """
+        Returns the clock speed (None for max speed) or False if invalid.
+        """
+        try:
+            return SimulationClock.requested_speed(message, seconds_per_tick)
+        except (TypeError, ValueError):
+            print(f"⚠️ Ignoring invalid speed: {message.get('rate', message.get('speed'))}")
+            return False
+
+    async def _drain_commands(self) -> bool:
+        """
+        Apply every queued command without waiting.
+
+        Returns:
+            False once the client has disconnected
+        """
+        while not self.commands.empty():
+            message = self.commands.get_nowait()
+            if message is None:
+                return False
+            await self.handle_command(message)
+        return True
+
+    async def _pause(self, seconds) -> bool:
+        """
+        Wait until the next batch is due, applying commands as they arrive.
+
+        Returns:
+            False once the client has disconnected
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return True
+            try:
+                message = await asyncio.wait_for(self.commands.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return True
+            if message is None:
+                return False
+            await self.handle_command(message)
+
+    async def _pause_until(self, deadline) -> bool:
+        """
+        Like _pause, but until a monotonic deadline from the SimulationClock.
+        """
+        now = time.monotonic()
+        if deadline <= now:
+            # Still yield, so the reader and other sessions get a turn at max speed
+            await asyncio.sleep(0)
+            return await self._drain_commands()
+        return await self._pause(deadline - now)
+
+    async def start(self, message):
+        target_date = message.get("date")
+        self.oms.session_id = message.get("session_id", self.oms.session_id)
+        self.outbound.set_policy(message.get("backpressure"))
+
+        self._leave_room()
+        self.replay = None
+        self._oms_cursor = 0
+        self.sentiment = bool(message.get("sentiment", self.sentiment))
+        self.sentiment_drift = bool(message.get("sentiment_drift"))
+        self._sentiment_minute = None
+
+        self.symbol = str(message.get("symbol") or self.symbol)
+        self.interval = str(message.get("interval") or self.interval)
+        try:
+            self.store = await asyncio.to_thread(open_market_data, self.symbol, self.interval, target_date)
+        except Exception as e:
+            print(f"❌ Market data load error: {e}")
+            self.store = None
+        if self.store is None:
+            print("⚠️ Parquet not found. Using Synthetic Data Generation.")
+        self.oms.symbol = self.outbound.symbol = self.store.symbol if self.store is not None else self.symbol
+
+        seconds_per_tick = replay_tick_seconds(self.store)
+        speed = self._requested_speed(message, seconds_per_tick)
+        if speed is False:
+            speed = SimulationClock.requested_speed({}, seconds_per_tick)
+
+        try:
+            room_id = message.get("room")
+            if room_id:
+                self.room = await room_registry.join(
+                    str(room_id), self, self.store, self.tick_cache, target_date, speed
+                )
+                print(f"▶️ Joined Room {room_id}")
+                await message_bus.update_session(self, symbol=self.symbol, interval=self.interval, room=room_id)
+                await self._send_session(resumed=False)
+                return
+
+            self.replay = await load_replay(self.store, self.tick_cache, self.oms.session_id, target_date, speed,
+                                            sentiment_drift=self.sentiment_drift)
+        except LookupError as e:
+            self.outbound.put_message({"type": "ERROR", "message": str(e)})
+            return
+        except Exception as e:
+            print(f"❌ Date filtering error: {e}")
+            return
+
+        label = "max" if speed is None else f"{speed}x"
+        print(f"▶️ Simulation Started (Speed: {label})")
+        await message_bus.update_session(self, symbol=self.symbol, interval=self.interval, date=target_date,
+                                         speed=speed, room="")
+        await self._send_session(resumed=False)
+
+    # =========================
+    # Snapshots / resume
+    # =========================
+    async def _send_session(self, resumed):
+        self.started = True
+        self._next_snapshot = 0.0
+        self.outbound.put_message({"type": "SESSION", "token": self.token, "resumed": resumed})
+        await message_bus.register_token(self)
+
+    def snapshot(self) -> dict:
+        """
+        Compact resume state of this session (see app/snapshots.py).
+
+        The replay is recorded as its position (candle row and tick index)
+        plus the seed and tick cache key of the synthesized day, so it is
+        rebuilt without resynthesizing. Ticks still waiting in the outbound
+        buffer were never received, so the delivery cursor excludes them
+        and they are re-sent on resume; the OMS state already includes them,
+        so oms_cursor records where it stands and those ticks are not
+        matched again.
+        """
+        self._snapshot_seq += 1
+        replay = self.replay
+        state = {
+            "token": self.token,
+            "seq": self._snapshot_seq,
+            "saved_at": time.time(),
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "room": self.room.room_id if self.room is not None else None,
+            "sentiment": self.sentiment,
+            "sentiment_drift": self.sentiment_drift,
+            "backpressure": self.outbound.policy,
+            "last_price": self.last_tick_price,
+            "replay": None,
+            "oms": self.oms.snapshot(),
+        }
+        if replay is not None:
+            oms_cursor = max(replay.cursor, self._oms_cursor)
+            cursor = max(replay.cursor - self.outbound.pending_ticks(), 0)
+            state["replay"] = {
+                "date": replay.target_date,
+                "seed": None if replay.seed is None else int(replay.seed),
+                "cache_key": replay.cache_key,
+                "cursor": cursor,
+                "oms_cursor": oms_cursor,
+                "row": cursor // TICKS_PER_CANDLE,
+                "tick": cursor % TICKS_PER_CANDLE,
+                "speed": replay.clock.speed,
+            }
+        return state
+
+    def _maybe_snapshot(self):
+        """
+        Write a snapshot in the background if one is due (never blocks the stream).
+        """
+        now = time.monotonic()
+        if not self.started or not message_bus.enabled or now < self._next_snapshot:
+            return
+        if self._snapshot_task is not None and not self._snapshot_task.done():
+            return
+        self._next_snapshot = now + SNAPSHOT_SECONDS
+        self._snapshot_task = message_bus.background(session_snapshots.save(self.snapshot()))
+
+    async def _park(self):
+        """
+        On disconnect: write a final snapshot and keep the live state here.
+        """
+        if not self.started:
+            return
+        state = self.snapshot()
+        session_snapshots.park(state, self.replay, self.oms, self.store)
+        await session_snapshots.save(state)
+
+    async def resume(self, token) -> bool:
+        """
+        Continue a dropped session from its parked state or Redis snapshot.
+
+        Returns:
+            False (after sending an ERROR) if the token cannot be resumed
+        """
+        started = time.perf_counter()
+        # The old connection may still look alive: end it so it parks its latest state
+        await message_bus.end_session(token, self)
+        state, parked = await session_snapshots.take(token)
+        if state is None:
+            SESSION_RESUMES.labels(source="failed").inc()
+            self.outbound.put_message({"type": "ERROR", "message": "Session expired or unknown, send START"})
+            return False
+
+        self.token = token
+        self._snapshot_seq = state["seq"]
+        self.symbol, self.interval = state["symbol"], state["interval"]
+        self.sentiment = state["sentiment"]
+        self.sentiment_drift = state.get("sentiment_drift", False)
+        self.outbound.set_policy(state["backpressure"])
+        self.last_tick_price = state["last_price"]
+        saved = state["replay"]
+
+        try:
+            if parked is not None:
+                # Same worker: the replay and OMS never left memory
+                self.oms, self.replay, self.store = parked.oms, parked.replay, parked.store
+                if self.replay is not None:
+                    self.replay.seek(saved["cursor"])
+                    self._oms_cursor = saved["oms_cursor"]
+            else:
+                self.oms.restore(state["oms"])
+                when = saved["date"] if saved else None
+                self.store = await asyncio.to_thread(open_market_data, self.symbol, self.interval, when)
+                if saved is not None:
+                    self.replay = await resume_replay(self.store, self.tick_cache, saved["date"], saved["seed"],
+                                                      saved["cache_key"], saved["cursor"], saved["speed"])
+                    if self.replay is None:
+                        raise LookupError("Replay cannot be rebuilt")
+                    self._oms_cursor = saved["oms_cursor"]
+            if state["room"]:
+                self.room = await room_registry.join(state["room"], self, self.store, self.tick_cache)
+        except Exception as e:
+            print(f"❌ Session resume failed: {e}")
+            SESSION_RESUMES.labels(source="failed").inc()
+            self.replay = self.room = None
+            self.outbound.put_message({"type": "ERROR", "message": "Session cannot be resumed, send START"})
+            return False
+
+        self.oms.symbol = self.outbound.symbol = self.replay.symbol if self.replay is not None else self.oms.symbol
+        await self._send_session(resumed=True)
+        elapsed = time.perf_counter() - started
+        SESSION_RESUMES.labels(source="memory" if parked is not None else "redis").inc()
+        SESSION_RESUME_SECONDS.observe(elapsed)
+        position = f"tick {saved['cursor']}" if saved else f"room {state['room']}"
+        print(f"♻️ Session resumed at {position} in {elapsed * 1000:.1f}ms")
+        await message_bus.update_session(self, symbol=self.symbol, interval=self.interval, room=state["room"] or "")
+        return True
+
+    def _leave_room(self):
+        if self.room is not None:
+            room_registry.leave(self.room, self)
+            self.room = None
+
+    # =========================
+    # Shared room subscriber
+    # =========================
+    def on_room_frame(self, frame):
+        """
+        Receive a SharedFrame from the room producer (must not block).
+        """
+        self.last_tick_price = float(frame.prices[-1])
+        self.outbound.put_shared(frame)
+
+        _, fills = self.oms.process_batch(frame.prices)
+        self._send_fills(fills)
+        self._send_sentiment(frame.epochs)
+        self._maybe_snapshot()
+
+        # Per-subscriber PnL overlay on top of the shared price stream
+        if self.oms.is_in_position:
+            self.outbound.put_latest("PNL", {
+                "type": "PNL",
+                "price": round(self.last_tick_price, 2),
+                "pnl": round(self.oms.calculate_pnl(self.last_tick_price), 2),
+            })
+
+    # =========================
+    # Writer / clock task
+    # =========================
+    async def _stream(self):
+        while True:
+            replay = self.replay
+            if replay is None:
+                # Idle (or fed by a room): block on the queue instead of polling
+                message = await self.commands.get()
+                if message is None:
+                    return
+                await self.handle_command(message)
+                continue
+
+            if replay.finished:
+                await self._next_day(replay)
+                continue
+
+            # 1. Wait for the next frame deadline (commands are applied while waiting)
+            if not await self._pause_until(replay.next_frame_time()):
+                return
+            if self.replay is not replay:
+                continue
+
+            # 2. Coalesce every tick that is due into one frame
+            frame = replay.take_frame()
+            if frame is None:
+                continue
+            epochs, prices = frame
+
+            # Commands queued since the previous frame fill at its first tick
+            self.last_tick_price = float(prices[0])
+            if not self.commands.empty() and not await self._drain_commands():
+                return
+
+            # --- OMS UPDATE (resting orders matched, frame marked to market) ---
+            frame_pnl, fills = self._process_frame(replay, prices)
+            frame_pnl = frame_pnl.tolist()
+            self.last_tick_price = float(prices[-1])
+            # ------------------
+
+            if self.replay is not replay:
+                continue
+
+            # 3. Send
+            await self.outbound.put_ticks(epochs, prices.tolist(), frame_pnl, block=replay.clock.is_max_speed)
+            self._send_fills(fills)
+            self._send_sentiment(epochs)
+            self._maybe_snapshot()
+
+    async def _next_day(self, replay):
+        """
+        Continue a finished replay with the next trading day (the first day
+        again at the end of the data; synthetic replays just rewind).
+        """
+        self._oms_cursor = 0
+        try:
+            loaded = await load_next_day(replay, self.interval, self.tick_cache, self.oms.session_id,
+                                         self.sentiment_drift)
+        except Exception as e:
+            print(f"⚠️ Next trading day failed to load: {e}")
+            loaded = None
+        if self.replay is not replay:
+            return  # A command replaced the replay meanwhile
+        if loaded is None:
+            print("🏁 End of Data. Restarting...")
+            replay.rewind()
+            return
+        self.store, self.replay = loaded
+        print(f"🏁 End of {replay.day.date}. Continuing with {self.replay.day.date}")
+
+    def _process_frame(self, replay, prices):
+        """
+        process_batch for a frame just taken from the replay, except for
+        ticks that are only re-sent after a resume: the restored OMS has
+        already matched those, so they are just marked to market.
+        """
+        first = replay.cursor - len(prices)
+        skip = min(max(self._oms_cursor - first, 0), len(prices))
+        if replay.cursor >= self._oms_cursor:
+            self._oms_cursor = 0
+        if not skip:
+            return self.oms.process_batch(prices)
+
+        pnl = np.empty(len(prices))
+        pnl[:skip] = self.oms.mark_to_market(prices[:skip])
+        pnl[skip:], fills = self.oms.process_batch(prices[skip:])
+        return pnl, fills
+
+
+def _optional_price(value):
+    return None if value is None else float(value)
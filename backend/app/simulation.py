@@ -1,6 +1,24 @@
+import hashlib
+
 import numpy as np
 
 
+def derive_seed(session_id, symbol, date) -> int:
+    """
+    Derive a stable 64-bit seed for a replay.
+    
+    The same (session_id, symbol, date) always maps to the same seed, in
+    every process, so a replay can be reproduced and its ticks cached.
+    
+    Args:
+        session_id: Trading session identifier
+        symbol: Instrument symbol (e.g. "NIFTY 50")
+        date: Trading day (e.g. "2024-01-15")
+    """
+    key = f"{session_id}|{symbol}|{date}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
 class TickSynthesizer:
     """
     Generates realistic intra-candle tick data using the Brownian Bridge algorithm.
@@ -13,15 +31,45 @@ class TickSynthesizer:
         """
         Initialize the TickSynthesizer.
         
+        Each synthesizer owns its own numpy Generator, so concurrent sessions
+        never share (or disturb) random state.
+        
+        Args:
+            seed: Optional random seed (int or np.random.SeedSequence) for
+                reproducibility, e.g. from derive_seed()
+        """
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+    
+    @classmethod
+    def for_session(cls, session_id, symbol, date):
+        """
+        Create a deterministic synthesizer for one session's replay of a day.
+        """
+        return cls(derive_seed(session_id, symbol, date))
+    
+    def spawn(self, n):
+        """
+        Spawn independent child synthesizers.
+        
+        Children draw from statistically independent streams derived from this
+        synthesizer's seed, so chunks of a day can be generated in parallel
+        (threads or processes) and still be reproducible.
+        
         Args:
-            seed: Optional random seed for reproducibility
+            n: Number of child synthesizers
+        
+        Returns:
+            List of TickSynthesizer instances
         """
-        if seed is not None:
-            np.random.seed(seed)
+        return [TickSynthesizer(child) for child in self.seed_sequence.spawn(n)]
     
     def generate_ticks(self, open_price, high, low, close, num_ticks=60):
         """
-        Generate tick prices using the Brownian Bridge formula.
+        Generate tick prices for a single candle using the Brownian Bridge formula.
         
         Formula: B(t) = Open + W(t) - (t/T) * (W(T) - (Close - Open))
         where W(t) is a Wiener process (cumulative sum of random normals).
@@ -36,30 +84,72 @@ class TickSynthesizer:
         Returns:
             List of tick prices (floats rounded to 2 decimals)
         """
-        # Generate time steps
-        T = num_ticks - 1  # Total time steps (0 to T)
-        t = np.arange(num_ticks)
+        return self.generate_day([open_price], [high], [low], [close], num_ticks)[0].tolist()
+    
+    def generate_day(self, open_, high, low, close, num_ticks=60, drift=None):
+        """
+        Generate ticks for a whole batch of candles (e.g. a trading day) at once.
         
-        # Generate Wiener process W(t)
-        # Standard Brownian motion: cumulative sum of random normal increments
+        Every candle gets its own Brownian Bridge, built in a single vectorized
+        pass over an (n_candles x num_ticks) matrix, clamped to the candle's
+        high/low and pinned to its open/close exactly like generate_ticks.
+        
+        Args:
+            open_, high, low, close: Array-likes of length n_candles
+            num_ticks: Ticks per candle, either an int or an int array of
+                length n_candles for a variable tick count
+            drift: Optional bias per candle (scalar or length n_candles),
+                e.g. news sentiment in [-1, 1]. The path is bowed towards the
+                high (positive) or low (negative) by drift * half the
+                candle's range at mid-candle; open and close stay pinned.
+        
+        Returns:
+            float64 array of shape (n_candles, max(num_ticks)) rounded to
+            2 decimals. With a variable tick count, row i holds num_ticks[i]
+            ticks followed by NaN padding.
+        """
+        open_ = np.asarray(open_, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        n_candles = len(open_)
+        
+        counts = np.broadcast_to(np.asarray(num_ticks, dtype=np.int64), (n_candles,))
+        width = int(counts.max()) if n_candles else int(np.max(num_ticks))
+        rows = np.arange(n_candles)
+        last = counts - 1
+        
+        # Generate time steps, one column per tick
+        T = np.maximum(last, 1)[:, None]  # Total time steps per candle
+        t = np.arange(width)[None, :]
+        
+        # Generate Wiener processes W(t), one row per candle
         dt = 1.0
-        dW = np.random.normal(0, np.sqrt(dt), num_ticks)
-        dW[0] = 0  # Start at zero
-        W_t = np.cumsum(dW)
+        dW = self.rng.normal(0, np.sqrt(dt), (n_candles, width))
+        dW[:, 0] = 0  # Start at zero
+        W_t = np.cumsum(dW, axis=1)
+        W_T = W_t[rows, last][:, None]
+        
+        # Apply Brownian Bridge formula row-wise
+        bridge = open_[:, None] + W_t - (t / T) * (W_T - (close - open_)[:, None])
         
-        # Apply Brownian Bridge formula
-        # B(t) = Open + W(t) - (t/T) * (W(T) - (Close - Open))
-        bridge = open_price + W_t - (t / T) * (W_t[-1] - (close - open_price))
+        # Sentiment bias: a bump that is zero at both ends (a constant drift in
+        # W(t) would cancel out of the bridge). Draws no random numbers.
+        if drift is not None:
+            drift = np.broadcast_to(np.asarray(drift, dtype=np.float64), (n_candles,))
+            shape = 4.0 * (t / T) * (1.0 - t / T)
+            bridge += (drift * (high - low) / 2.0)[:, None] * np.clip(shape, 0.0, None)
         
         # Enforce high/low constraints using clamping
-        bridge = np.minimum(bridge, high)  # Clamp to high
-        bridge = np.maximum(bridge, low)   # Clamp to low
+        np.minimum(bridge, high[:, None], out=bridge)  # Clamp to high
+        np.maximum(bridge, low[:, None], out=bridge)   # Clamp to low
         
         # Ensure exact start and end values
-        bridge[0] = open_price
-        bridge[-1] = close
+        bridge[:, 0] = open_
+        bridge[rows, last] = close
         
-        # Convert to Python list with 2 decimal rounding
-        ticks = [round(float(price), 2) for price in bridge]
+        # Blank out the padding of candles with fewer ticks
+        if width and (counts != width).any():
+            bridge[t >= counts[:, None]] = np.nan
         
-        return ticks
+        return np.round(bridge, 2, out=bridge)
@@ -0,0 +1,110 @@
+# File: backend/app/snapshots.py
+#
+# Resume state of /ws/ticker sessions. Every session periodically writes a
+# compact snapshot (replay position, tick seed and cache key, OMS state,
+# speed) to Redis under snapshot:<token>; a client reconnecting with
+# ?resume=<token> continues at the first tick it had not received.
+#
+# A session that disconnects also parks its live Replay and OrderManager
+# in this worker for SESSION_RESUME_TTL, so a reconnect landing on the same
+# worker resumes without touching Redis data, the catalog or the tick cache.
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+from .bus import message_bus
+
+SNAPSHOT_SECONDS = float(os.getenv("SNAPSHOT_SECONDS", "1.0"))  # Min seconds between snapshots of a session
+SESSION_RESUME_TTL = int(os.getenv("SESSION_RESUME_TTL", "600"))  # How long a dropped session can be resumed
+PARKED_SESSIONS_MAX = int(os.getenv("PARKED_SESSIONS_MAX", "1000"))
+
+
+def snapshot_key(token) -> str:
+    return f"snapshot:{token}"
+
+
+class ParkedSession:
+    """
+    Live state of a session that disconnected from this worker.
+    """
+
+    __slots__ = ("state", "replay", "oms", "store", "parked_at")
+
+    def __init__(self, state, replay, oms, store):
+        self.state = state
+        self.replay = replay
+        self.oms = oms
+        self.store = store
+        self.parked_at = time.monotonic()
+
+
+class SnapshotStore:
+    """
+    Latest snapshot of every session (Redis, shared by all workers) plus the
+    sessions parked on this worker.
+
+    Without Redis (message bus disabled) snapshots are not written anywhere
+    and only same-process resumes from parked sessions are possible.
+    """
+
+    def __init__(self, ttl=SESSION_RESUME_TTL, max_parked=PARKED_SESSIONS_MAX):
+        self.ttl = ttl
+        self.max_parked = max_parked
+        self.parked = OrderedDict()  # token -> ParkedSession, oldest first
+
+    async def save(self, state):
+        """
+        Write a session snapshot (a JSON-serializable dict with a "token").
+        """
+        if not message_bus.enabled:
+            return
+        try:
+            await message_bus.redis.set(snapshot_key(state["token"]), json.dumps(state), ex=self.ttl)
+        except Exception as e:
+            print(f"⚠️ Session snapshot write failed: {e}")
+
+    async def load(self, token) -> dict | None:
+        if not message_bus.enabled:
+            return None
+        try:
+            payload = await message_bus.redis.get(snapshot_key(token))
+        except Exception as e:
+            print(f"⚠️ Session snapshot read failed: {e}")
+            return None
+        return json.loads(payload) if payload else None
+
+    def park(self, state, replay, oms, store):
+        self._expire()
+        self.parked.pop(state["token"], None)
+        self.parked[state["token"]] = ParkedSession(state, replay, oms, store)
+        while len(self.parked) > self.max_parked:
+            self.parked.popitem(last=False)
+
+    async def take(self, token):
+        """
+        Claim a session's resume state.
+
+        Returns:
+            (state, parked): the newest snapshot and the ParkedSession if it
+            is still current (None if the session moved on elsewhere), or
+            (None, None) if the token is unknown or expired
+        """
+        self._expire()
+        parked = self.parked.pop(token, None)
+        state = await self.load(token)
+        if parked is not None and (state is None or parked.state["seq"] >= state["seq"]):
+            return parked.state, parked
+        return state, None
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl
+        while self.parked:
+            token, parked = next(iter(self.parked.items()))
+            if parked.parked_at > deadline:
+                break
+            del self.parked[token]
+
+
+session_snapshots = SnapshotStore()
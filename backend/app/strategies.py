@@ -0,0 +1,28 @@
+# File: backend/app/strategies.py
+#
+# Example strategies for the headless backtester (app/backtest.py).
+# A strategy is a module-level function called as strategy(ctx) after every
+# tick batch; see BacktestContext for what ctx offers.
+
+import numpy as np
+
+
+def buy_and_hold(ctx):
+    """
+    Buy 50 on the first batch of the day and hold until the close.
+    """
+    if not ctx.state.get("entered"):
+        ctx.buy(50)
+        ctx.state["entered"] = True
+
+
+def breakout_bracket(ctx, lookback=15, qty=50, stop=20.0, target=40.0):
+    """
+    Buy a new high of the last `lookback` batches with a bracket exit.
+    """
+    highs = ctx.state.setdefault("highs", [])
+    batch_high = float(np.max(ctx.prices))
+
+    if len(highs) >= lookback and not ctx.oms.is_in_position and batch_high > max(highs[-lookback:]):
+        ctx.buy(qty, stop_loss=ctx.price - stop, take_profit=ctx.price + target)
+    highs.append(batch_high)
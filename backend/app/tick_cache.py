@@ -0,0 +1,154 @@
+# File: backend/app/tick_cache.py
+
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .metrics import TICK_CACHE_BYTES, TICK_CACHE_EVICTIONS, TICK_CACHE_HITS, TICK_CACHE_MISSES
+
+TICK_CACHE_MAX_BYTES = int(os.getenv("TICK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+TICK_CACHE_TTL = int(os.getenv("TICK_CACHE_TTL", str(24 * 3600)))
+TICK_CACHE_REDIS_RETRY_SECONDS = float(os.getenv("TICK_CACHE_REDIS_RETRY_SECONDS", "30"))  # Back-off after Redis errors
+
+# Header: n_candles (int64), ticks_per_candle (int64), base price (float64)
+_HEADER = struct.Struct("<qqd")
+
+
+def tick_cache_key(symbol, date, seed, ticks_per_candle) -> str:
+    return f"ticks:{symbol}:{date}:{seed}:{ticks_per_candle}"
+
+
+def encode_ticks(ticks: np.ndarray) -> bytes:
+    """
+    Pack a (n_candles x ticks_per_candle) tick matrix into compact bytes.
+
+    Prices are stored as float32 offsets from a float64 base price, which
+    keeps 2-decimal precision for any index level at half the size of float64.
+    """
+    n_candles, width = ticks.shape
+    base = float(np.nanmin(ticks)) if ticks.size else 0.0
+    deltas = (ticks - base).astype("<f4")
+    return _HEADER.pack(n_candles, width, base) + deltas.tobytes()
+
+
+def decode_ticks(payload: bytes) -> np.ndarray:
+    n_candles, width, base = _HEADER.unpack_from(payload)
+    deltas = np.frombuffer(payload, dtype="<f4", offset=_HEADER.size, count=n_candles * width)
+    ticks = np.round(deltas.astype(np.float64) + base, 2).reshape(n_candles, width)
+    ticks.flags.writeable = False
+    return ticks
+
+
+class TickCache:
+    """
+    Two-tier cache of fully synthesized tick days.
+
+    Tier 1 is an in-process LRU bounded by total array bytes. Tier 2 is Redis,
+    shared by every backend process. Cached arrays are read-only and shared
+    between sessions, so a cache hit costs no synthesis and no copy.
+
+    After a Redis error the Redis tier is skipped for
+    TICK_CACHE_REDIS_RETRY_SECONDS, so an unreachable Redis costs one
+    timeout per back-off period instead of one per lookup.
+    """
+
+    def __init__(self, redis_client=None, max_bytes=TICK_CACHE_MAX_BYTES, ttl=TICK_CACHE_TTL):
+        """
+        Args:
+            redis_client: Redis client created with decode_responses=False,
+                or None for a memory-only cache
+            max_bytes: Size bound of the in-process LRU
+            ttl: Expiry of Redis entries in seconds
+        """
+        self.redis = redis_client
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self.redis_available = True
+        self.retry_at = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            ticks = self._entries.get(key)
+            if ticks is not None:
+                self._entries.move_to_end(key)
+                TICK_CACHE_HITS.labels(tier="memory").inc()
+                return ticks
+
+        payload = None
+        if self._redis_ready():
+            try:
+                payload = self.redis.get(key)
+                self.redis_available = True
+            except Exception as e:
+                self._redis_failed("read", e)
+
+        if payload is None:
+            TICK_CACHE_MISSES.inc()
+            return None
+
+        TICK_CACHE_HITS.labels(tier="redis").inc()
+        ticks = decode_ticks(payload)
+        self._put_local(key, ticks)
+        return ticks
+
+    def put(self, key: str, ticks: np.ndarray) -> np.ndarray:
+        """
+        Store a tick day in both tiers and return the shared read-only copy.
+        """
+        payload = encode_ticks(ticks)
+        if self._redis_ready():
+            try:
+                self.redis.set(key, payload, ex=self.ttl)
+                self.redis_available = True
+            except Exception as e:
+                self._redis_failed("write", e)
+
+        # Keep exactly what other processes will decode, so every tier agrees
+        ticks = decode_ticks(payload)
+        self._put_local(key, ticks)
+        return ticks
+
+    def get_or_create(self, key: str, synthesize) -> np.ndarray:
+        """
+        Return the cached tick day, calling synthesize() only on a miss.
+        """
+        ticks = self.get(key)
+        if ticks is None:
+            ticks = self.put(key, synthesize())
+        return ticks
+
+    def _redis_ready(self):
+        if self.redis is None:
+            return False
+        return self.redis_available or time.monotonic() >= self.retry_at
+
+    def _redis_failed(self, operation, error):
+        if self.redis_available:
+            print(f"⚠️ Tick cache Redis {operation} failed, memory only for {TICK_CACHE_REDIS_RETRY_SECONDS:g}s: {error}")
+        self.redis_available = False
+        self.retry_at = time.monotonic() + TICK_CACHE_REDIS_RETRY_SECONDS
+
+    def _put_local(self, key, ticks):
+        if ticks.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+
+            self._entries[key] = ticks
+            self.current_bytes += ticks.nbytes
+
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                TICK_CACHE_EVICTIONS.inc()
+
+            TICK_CACHE_BYTES.set(self.current_bytes)
@@ -0,0 +1,195 @@
+# File: backend/app/trade_journal.py
+
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from .metrics import JOURNAL_FLUSH_SECONDS, JOURNAL_QUEUE_DEPTH, JOURNAL_SPILLED_TRADES
+from .models import TradeLog, engine
+
+JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", "500"))
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "1.0"))
+JOURNAL_SPILL_PATH = os.getenv("JOURNAL_SPILL_PATH", "data/trade_journal.spill.jsonl")
+
+_DATETIME_FIELDS = ("entry_time", "exit_time")
+
+
+class TradeJournal:
+    """
+    Write-behind journal for closed trades.
+
+    record() only appends to an in-memory queue. A background
+    thread flushes the queue to trade_logs in bulk (one executemany per
+    batch) whenever JOURNAL_BATCH_SIZE trades are waiting or
+    JOURNAL_FLUSH_INTERVAL seconds have passed, so no WebSocket session
+    ever waits on a Postgres round-trip.
+
+    If a flush fails (e.g. the database is down), the batch is appended to a
+    local JSON-lines spill file and re-inserted after the next successful
+    flush, or on the next start. The spill file is shared by every worker
+    process, so spilling and recovery hold an exclusive flock on
+    <spill_path>.lock.
+    """
+
+    def __init__(self, db_engine=None, batch_size=JOURNAL_BATCH_SIZE,
+                 flush_interval=JOURNAL_FLUSH_INTERVAL, spill_path=JOURNAL_SPILL_PATH):
+        self.engine = db_engine or engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def record(self, trade: dict):
+        """
+        Queue one closed trade (TradeLog column values) for persistence.
+        """
+        self._ensure_started()
+        self._queue.put(trade)
+        JOURNAL_QUEUE_DEPTH.set(self._queue.qsize())
+
+    def close(self, timeout=10.0):
+        """
+        Flush everything still queued and stop the writer thread.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    # =========================
+    # Writer thread
+    # =========================
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        self._recover_spill()
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _next_batch(self):
+        """
+        Collect up to batch_size trades, waiting at most flush_interval.
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        JOURNAL_QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    def _insert(self, rows):
+        # One transaction, bulk executemany in chunks of batch_size
+        with self.engine.begin() as conn:
+            for i in range(0, len(rows), self.batch_size):
+                conn.execute(insert(TradeLog), rows[i:i + self.batch_size])
+
+    def _flush(self, rows):
+        start = time.perf_counter()
+        try:
+            self._insert(rows)
+        except Exception as e:
+            print(f"⚠️ Trade journal flush failed ({len(rows)} trades spilled to disk): {e}")
+            self._spill(rows)
+            return
+        finally:
+            JOURNAL_FLUSH_SECONDS.observe(time.perf_counter() - start)
+
+        print(f"💾 Trade journal: flushed {len(rows)} trades")
+        self._recover_spill()
+
+    # =========================
+    # Spill file
+    # =========================
+    def _spill_lock(self, blocking=True):
+        """
+        Open and flock the spill lock file.
+
+        Returns:
+            The locked file (closing it releases the lock), or None if
+            blocking is False and another process holds the lock
+        """
+        directory = os.path.dirname(self.spill_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock = open(self.spill_path + ".lock", "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+    def _spill(self, rows):
+        with self._spill_lock():
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(_to_json(row)) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        JOURNAL_SPILLED_TRADES.inc(len(rows))
+
+    def _recover_spill(self):
+        recovering = self.spill_path + ".recovering"
+        if not os.path.exists(recovering) and not os.path.exists(self.spill_path):
+            return
+
+        # Another worker already recovering: it will pick up these rows too
+        lock = self._spill_lock(blocking=False)
+        if lock is None:
+            return
+        with lock:
+            # A leftover .recovering file is from a recovery that failed to insert
+            if not os.path.exists(recovering):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, recovering)
+
+            with open(recovering, encoding="utf-8") as f:
+                rows = [_from_json(json.loads(line)) for line in f if line.strip()]
+
+            try:
+                self._insert(rows)
+            except Exception as e:
+                print(f"⚠️ Trade journal recovery deferred: {e}")
+                return
+
+            os.remove(recovering)
+        print(f"♻️ Trade journal: recovered {len(rows)} spilled trades")
+
+
+def _to_json(row):
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+
+
+def _from_json(row):
+    for field in _DATETIME_FIELDS:
+        if row.get(field):
+            row[field] = datetime.fromisoformat(row[field])
+    return row
+
+
+trade_journal = TradeJournal()
@@ -0,0 +1,161 @@
+# File: backend/app/wire.py
+#
+# Binary wire format for /ws/ticker BATCH frames.
+#
+# Clients opt in during the WebSocket handshake, either with the
+# "tradeshift.bin.v1" subprotocol or with ?format=binary. JSON stays the
+# default for everyone else.
+#
+# Frame layout (little-endian):
+#
+#   offset  type        field
+#   0       uint8       message type (1 = BATCH)
+#   1       uint8       version (1)
+#   2       uint16      symbol length in bytes (S)
+#   4       float64     base epoch (seconds, exchange wall-clock time)
+#   12      float64     base price
+#   20      uint32      tick count (N)
+#   24      bytes[S]    UTF-8 symbol, zero-padded to a multiple of 4
+#   ...     int32[N]    price deltas from base price, in hundredths
+#   ...     uint32[N]   second offsets from base epoch
+#   ...     float32[N]  pnl
+#
+# Every array starts on a 4-byte boundary so browsers can view it directly
+# with Int32Array / Uint32Array / Float32Array.
+
+import datetime
+import json
+import struct
+
+import numpy as np
+
+BINARY_SUBPROTOCOL = "tradeshift.bin.v1"
+
+MSG_BATCH = 1
+VERSION = 1
+
+_HEADER = struct.Struct("<BBHddI")
+
+EPOCH_DT = datetime.datetime(1970, 1, 1)
+
+
+def negotiate_format(websocket) -> tuple[str, str | None]:
+    """
+    Pick the wire format for a connection from its handshake.
+
+    Returns:
+        (format, subprotocol) where format is "binary" or "json" and
+        subprotocol is the value to echo back in websocket.accept()
+    """
+    if BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", []):
+        return "binary", BINARY_SUBPROTOCOL
+    if websocket.query_params.get("format") == "binary":
+        return "binary", None
+    return "json", None
+
+
+def encode_batch_json(symbol: str, epochs, prices, pnl=None) -> str:
+    """
+    Encode one BATCH of ticks as the default JSON text frame.
+
+    Args:
+        symbol: Instrument symbol
+        epochs: Epoch seconds of each tick
+        prices: Tick prices
+        pnl: Unrealized PnL at each tick, or None to omit the field
+            (shared room frames, where PnL is per subscriber)
+    """
+    batch_data = []
+    for i, (tick_epoch, tick_price) in enumerate(zip(np.asarray(epochs).tolist(), prices)):
+        tick = {
+            "price": round(tick_price, 2),
+            "timestamp": (EPOCH_DT + datetime.timedelta(seconds=tick_epoch)).isoformat(),
+            "symbol": symbol,
+        }
+        if pnl is not None:
+            tick["pnl"] = round(pnl[i], 2)
+        batch_data.append(tick)
+    return json.dumps({"type": "BATCH", "data": batch_data}, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_batch(symbol: str, base_epoch: float, prices, offsets, pnl) -> bytes:
+    """
+    Pack one BATCH of ticks into a columnar binary frame.
+
+    Args:
+        symbol: Instrument symbol
+        base_epoch: Epoch seconds of offset 0
+        prices: Tick prices (2-decimal)
+        offsets: Whole-second offsets of each tick from base_epoch
+        pnl: Unrealized PnL at each tick
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    cents = np.round(prices * 100).astype(np.int64)
+    base_cents = int(cents[0]) if len(cents) else 0
+
+    symbol_bytes = symbol.encode("utf-8")
+    padding = b"\0" * (-len(symbol_bytes) % 4)
+
+    return b"".join((
+        _HEADER.pack(MSG_BATCH, VERSION, len(symbol_bytes), base_epoch, base_cents / 100, len(prices)),
+        symbol_bytes,
+        padding,
+        (cents - base_cents).astype("<i4").tobytes(),
+        np.asarray(offsets, dtype="<u4").tobytes(),
+        np.asarray(pnl, dtype="<f4").tobytes(),
+    ))
+
+
+def decode_batch(payload: bytes) -> dict:
+    """
+    Unpack a binary BATCH frame (the inverse of encode_batch).
+    """
+    _, _, symbol_len, base_epoch, base_price, n = _HEADER.unpack_from(payload)
+    offset = _HEADER.size
+    symbol = payload[offset:offset + symbol_len].decode("utf-8")
+    offset += symbol_len + (-symbol_len % 4)
+
+    deltas = np.frombuffer(payload, dtype="<i4", count=n, offset=offset)
+    offset += 4 * n
+    offsets = np.frombuffer(payload, dtype="<u4", count=n, offset=offset)
+    offset += 4 * n
+    pnl = np.frombuffer(payload, dtype="<f4", count=n, offset=offset)
+
+    return {
+        "symbol": symbol,
+        "base_epoch": base_epoch,
+        "prices": np.round(base_price + deltas / 100, 2),
+        "offsets": offsets,
+        "pnl": pnl,
+    }
+
+
+class SharedFrame:
+    """
+    A tick frame that is sent unchanged to many subscribers (see app/rooms.py).
+
+    Each wire format is encoded at most once, on first use, and the same
+    bytes / text are reused for every subscriber. Shared frames carry no PnL
+    (zeros in binary, omitted in JSON); subscribers get their own PNL overlay.
+    """
+
+    __slots__ = ("symbol", "epochs", "prices", "_json", "_binary")
+
+    def __init__(self, symbol, epochs, prices):
+        self.symbol = symbol
+        self.epochs = epochs
+        self.prices = prices
+        self._json = None
+        self._binary = None
+
+    def encoded(self, wire_format):
+        if wire_format == "binary":
+            if self._binary is None:
+                base_epoch = float(self.epochs[0])
+                self._binary = encode_batch(
+                    self.symbol, base_epoch, self.prices, self.epochs - base_epoch, np.zeros(len(self.prices))
+                )
+            return self._binary
+        if self._json is None:
+            self._json = encode_batch_json(self.symbol, self.epochs, self.prices)
+        return self._json
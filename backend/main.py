@@ -1,35 +1,34 @@
 # File: backend/main.py
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import pandas as pd
 from minio import Minio
 import io
 import os
 import json
 import asyncio
-import datetime
+from datetime import datetime
 from redis import Redis
 from prometheus_fastapi_instrumentator import Instrumentator
-from app.oms import OrderManager
-
-# --- 1. ROBUST IMPORT FOR SIMULATION ---
-try:
-    from app.simulation import TickSynthesizer
-    print("✅ Brownian Bridge Engine Loaded")
-except ImportError:
-    print("⚠️ Warning: simulation.py not found. Using Mock Fallback.")
-    class TickSynthesizer:
-        def generate_ticks(self, o, h, l, c, num_ticks=60):
-            return [o] * num_ticks
+from app.bus import WORKER_ID, message_bus
+from app.database import async_engine
+from app.candle_store import fetch_candles
+from app.catalog import DEFAULT_INTERVAL, DEFAULT_SYMBOL
+from app.schemas import CandleResponse
+from app.sentiment import sentiment_index
+from app.session import TickerSession
+from app.tick_cache import TickCache
+from app.trade_journal import trade_journal
+from app.wire import negotiate_format
 
 app = FastAPI()
 
 # Instrumentator (Monitoring)
 Instrumentator().instrument(app).expose(app)
 
-# --- 2. SECURITY (CORS) ---
+# --- 1. SECURITY (CORS) ---
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,12 +37,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- 3. INFRASTRUCTURE CONNECTIONS ---
-try:
-    engine = create_engine("postgresql://user:password@db:5432/tradeshift")
-except Exception as e:
-    print(f"⚠️ DB Connection Warning: {e}")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
+# --- 2. INFRASTRUCTURE CONNECTIONS ---
+# Postgres: pooled sync + asyncpg engines come from app/database.py
 try:
     minio_client = Minio("minio:9000", "minioadmin", "minioadmin", secure=False)
 except Exception:
@@ -54,144 +51,82 @@ try:
 except Exception:
     print("⚠️ Redis not connected")
 
-# --- 4. WEBSOCKET ENDPOINT ---
+# Binary-safe client for the tick cache (packed arrays, not text)
+try:
+    tick_cache = TickCache(
+        Redis(
+            host='tradeshift_redis', port=6379, decode_responses=False,
+            socket_connect_timeout=2, socket_timeout=5,
+        )
+    )
+except Exception:
+    tick_cache = TickCache()
+
+@app.on_event("startup")
+async def start_sentiment_index():
+    # News sentiment is refreshed in the background; sessions only read arrays
+    app.state.sentiment_task = asyncio.create_task(sentiment_index.run())
+    # Cross-worker session registry, rooms and broadcasts (app/bus.py)
+    await message_bus.start()
+
+@app.on_event("shutdown")
+async def close_database():
+    # Flush pending trades (sync engine, off the loop) before dropping the pools
+    app.state.sentiment_task.cancel()
+    await message_bus.stop()
+    await asyncio.to_thread(trade_journal.close)
+    await async_engine.dispose()
+
+# --- 3. CHART HISTORY ---
+@app.get("/api/candles", response_model=list[CandleResponse])
+async def get_candles(symbol: str = DEFAULT_SYMBOL, interval: str = "5m",
+                      start: datetime | None = None, end: datetime | None = None, limit: int = 1000):
+    # Higher timeframes come straight from the TimescaleDB continuous aggregates
+    try:
+        return await fetch_candles(symbol, interval, start, end, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"⚠️ Candle query failed: {e}")
+        raise HTTPException(status_code=503, detail="Candle store unavailable")
+
+# --- 4. ADMIN ---
+def require_admin(token):
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.post("/admin/broadcast")
+async def admin_broadcast(payload: dict, x_admin_token: str = Header(default="")):
+    # Delivered as a BROADCAST message to every session on every worker
+    require_admin(x_admin_token)
+    workers = await message_bus.broadcast(payload)
+    return {"workers": workers}
+
+@app.get("/admin/sessions")
+async def admin_sessions(x_admin_token: str = Header(default="")):
+    require_admin(x_admin_token)
+    return {"worker": WORKER_ID, "sessions": await message_bus.list_sessions()}
+
+# --- 5. WEBSOCKET ENDPOINT ---
 @app.websocket("/ws/ticker")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    print("🟢 Client Connected")
-
-    # Internal State
-    is_running = False
-    speed = 1.0
-    synthesizer = TickSynthesizer()
-    oms = OrderManager()
-    last_tick_price = 21500.0  # Default value to prevent errors before stream starts
-    
-    # Data Source
-    file_path = "data/NIFTY_50_1min.parquet"
-    iterator = None
-    using_real_data = False
-
-    if os.path.exists(file_path):
-        print(f"📂 Loaded: {file_path}")
-        df = pd.read_parquet(file_path)
-        df.columns = df.columns.str.lower()
-        records = df.to_dict(orient="records")
-        iterator = iter(records)
-        using_real_data = True
-    else:
-        print("⚠️ Parquet not found. Using Synthetic Data Generation.")
-
+    # Clients opt into binary BATCH frames during the handshake; JSON is the default
+    wire_format, subprotocol = negotiate_format(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    print(f"🟢 Client Connected ({wire_format})")
+
+    # Data Source: resolved per START through the dataset catalog (app/catalog.py)
+    symbol = websocket.query_params.get("symbol", DEFAULT_SYMBOL)
+    interval = websocket.query_params.get("interval", DEFAULT_INTERVAL)
+    sentiment = websocket.query_params.get("sentiment") in ("1", "true")
+    # Reconnects pass the token from their SESSION message to continue where they dropped
+    resume_token = websocket.query_params.get("resume")
+
+    session = TickerSession(websocket, tick_cache, wire_format, symbol, interval, sentiment, resume_token)
     try:
-        while True:
-            # A. CHECK FOR COMMANDS (Non-blocking)
-            try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=0.001)
-                message = json.loads(data)
-                command = message.get("command")
-                
-                if command == "START":
-                    target_date = message.get("date")
-                    speed = float(message.get("speed", 1.0))
-                    
-                    if using_real_data:
-                        try:
-                            # Date Logic
-                            date_col = None
-                            if 'date' in df.columns: date_col = 'date'
-                            elif 'datetime' in df.columns: date_col = 'datetime'
-                            
-                            if not date_col:
-                                await websocket.send_json({"type": "ERROR", "message": "Dataset has no date column"})
-                                continue
-
-                            # Filter DataFrame
-                            temp_df = df.copy()
-                            temp_df[date_col] = pd.to_datetime(temp_df[date_col])
-                            
-                            if not target_date:
-                                first_date = temp_df[date_col].min().date()
-                                target_date = str(first_date)
-                            
-                            target_dt = pd.to_datetime(target_date).date()
-                            mask = temp_df[date_col].dt.date == target_dt
-                            filtered_df = temp_df[mask]
-
-                            if filtered_df.empty:
-                                await websocket.send_json({"type": "ERROR", "message": f"No data found for date: {target_date}"})
-                                continue
-
-                            print(f"✅ Found {len(filtered_df)} records for {target_date}")
-                            current_records = filtered_df.to_dict(orient="records")
-                            iterator = iter(current_records)
-
-                        except Exception as e:
-                            print(f"❌ Date filtering error: {e}")
-                            continue
-
-                    is_running = True
-                    print(f"▶️ Simulation Started (Speed: {speed}x)")
-                
-                # --- OMS INTEGRATION (The Fix) ---
-                elif command == "BUY":
-                    oms.buy(last_tick_price, qty=50)
-                
-                elif command == "SELL":
-                    oms.sell(last_tick_price, qty=50)
-                # ---------------------------------
-
-            except asyncio.TimeoutError:
-                pass # No command received, keep streaming
-
-            # B. STREAM DATA (Only if running)
-            if is_running:
-                # 1. Get Next Candle
-                if using_real_data:
-                    try:
-                        row = next(iterator)
-                        open_p, high, low, close = row['open'], row['high'], row['low'], row['close']
-                        base_time = pd.to_datetime(row.get('date') or row.get('datetime'))
-                    except StopIteration:
-                        print("🏁 End of Data. Restarting...")
-                        iterator = iter(records)
-                        continue
-                else:
-                    open_p, high, low, close = 21500, 21510, 21490, 21505
-                    base_time = datetime.datetime.now()
-
-                # 2. Generate 60 Micro-Ticks
-                ticks = synthesizer.generate_ticks(open_p, high, low, close, num_ticks=60)
-
-                # 3. Stream Loop (Batching)
-                BATCH_SIZE = 10
-                tick_batches = [ticks[i:i + BATCH_SIZE] for i in range(0, len(ticks), BATCH_SIZE)]
-                
-                for batch_index, batch_ticks in enumerate(tick_batches):
-                    if not is_running: break 
-                    
-                    batch_data = []
-                    for i, tick_price in enumerate(batch_ticks):
-                        abs_index = (batch_index * BATCH_SIZE) + i
-                        tick_time = base_time + datetime.timedelta(seconds=abs_index)
-                        
-                        # --- OMS UPDATE ---
-                        last_tick_price = float(tick_price)
-                        current_pnl = oms.calculate_pnl(last_tick_price)
-                        # ------------------
-
-                        batch_data.append({
-                            "price": round(last_tick_price, 2),
-                            "timestamp": tick_time.isoformat(),
-                            "symbol": "NIFTY 50",
-                            "pnl": round(current_pnl, 2)
-                        })
-                    
-                    await websocket.send_json({"type": "BATCH", "data": batch_data})
-                    await asyncio.sleep(0.1 / max(speed, 0.1))
-            else:
-                await asyncio.sleep(0.1)
-
+        await session.run()
+        print("🔴 Disconnected")
     except WebSocketDisconnect:
         print("🔴 Disconnected")
     except Exception as e:
-        print(f"⚠️ Error: {e}")
\ No newline at end of file
+        print(f"⚠️ Error: {e}")
@@ -0,0 +1,47 @@
+import argparse
+import json
+import os
+import sys
+
+# Ensure the parent directory is in the sys.path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.backtest import BACKTEST_BATCH_TICKS, run_backtest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Tradeshift backtest over synthesized ticks")
+    parser.add_argument("--strategy", default="app.strategies:breakout_bracket",
+                        help="Strategy as package.module:function")
+    parser.add_argument("--start", help="First trading day (inclusive)")
+    parser.add_argument("--end", help="Last trading day (inclusive)")
+    parser.add_argument("--file", default="data/NIFTY_50_1min.parquet", help="Minute candles (Parquet)")
+    parser.add_argument("--symbol", default="NIFTY 50")
+    parser.add_argument("--seed", default="backtest", help="Seed key for the tick synthesizer")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all CPUs)")
+    parser.add_argument("--batch-ticks", type=int, default=BACKTEST_BATCH_TICKS)
+    parser.add_argument("--out", help="Directory for trades.csv and equity.csv")
+    args = parser.parse_args()
+
+    print(f"🚀 Backtesting {args.strategy} on {args.symbol}...")
+    try:
+        result = run_backtest(
+            args.strategy, args.start, args.end,
+            file_path=args.file, symbol=args.symbol, seed_key=args.seed,
+            workers=args.workers, batch_ticks=args.batch_ticks,
+        )
+    except LookupError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(json.dumps(result.summary(), indent=2))
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        result.trades.to_csv(os.path.join(args.out, "trades.csv"), index=False)
+        result.equity.to_csv(os.path.join(args.out, "equity.csv"), index=False)
+        print(f"💾 Saved trades.csv and equity.csv to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# File: backend/tests/test_catalog.py
+
+import time
+
+import pandas as pd
+import pytest
+
+from app import catalog as catalog_module
+from app.catalog import DataCatalog, DatasetEntry, ParquetDiskCache, next_trading_day
+
+BUCKET = "market-data"
+
+
+def _write_partition(cache_dir, days):
+    """
+    Write one month partition of 1-minute candles into the disk cache, as
+    if it had been fetched from MinIO, and return its catalog entry.
+    """
+    timestamps = pd.DatetimeIndex([
+        ts for day in days for ts in pd.date_range(f"{day} 09:15", periods=3, freq="1min")
+    ])
+    month = timestamps[0].strftime("%Y-%m")
+    entry = DatasetEntry("NIFTY_50", "1min", timestamps[0], timestamps[-1], BUCKET,
+                         f"NIFTY_50/1min/{month}/data.parquet")
+    path = cache_dir / BUCKET / entry.local_name().split("/", 1)[1]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({
+        "date": timestamps, "open": 100.0, "high": 101.0, "low": 99.0, "close": 100.5,
+    }).to_parquet(path)
+    return entry
+
+
+@pytest.fixture
+def partitioned_catalog(tmp_path, monkeypatch):
+    entries = [
+        _write_partition(tmp_path, ["2023-08-30", "2023-08-31"]),
+        # September ends on a Friday: the next day is covered by no partition
+        _write_partition(tmp_path, ["2023-09-28", "2023-09-29"]),
+        _write_partition(tmp_path, ["2023-10-02", "2023-10-03"]),
+    ]
+    catalog = DataCatalog(db_engine=object())
+    catalog.entries = {("NIFTY_50", "1min"): entries}
+    catalog.loaded_at = time.monotonic()
+    monkeypatch.setattr(catalog_module, "catalog", catalog)
+    monkeypatch.setattr(catalog_module, "dataset_cache", ParquetDiskCache(cache_dir=str(tmp_path)))
+    return catalog
+
+
+def test_next_trading_day_within_a_partition(partitioned_catalog):
+    assert next_trading_day("NIFTY 50", "1min", "2023-09-28") == "2023-09-29"
+
+
+def test_next_trading_day_crosses_a_month_ending_before_a_weekend(partitioned_catalog):
+    assert next_trading_day("NIFTY 50", "1min", "2023-09-29") == "2023-10-02"
+    assert next_trading_day("NIFTY 50", "1min", "2023-08-31") == "2023-09-28"
+
+
+def test_next_trading_day_at_the_end_of_the_data(partitioned_catalog):
+    assert next_trading_day("NIFTY 50", "1min", "2023-10-03") is None
@@ -4,17 +4,58 @@ import requests
 from bs4 import BeautifulSoup
 import time
 import sys
+import os
+import hashlib
+import html
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+from redis import Redis
+from requests.adapters import HTTPAdapter
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, func, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime
 
+# Ensure the parent directory is in the sys.path so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import create_db_engine
+
+# Worker mode: "batch" (concurrent fetches, bulk inserts) or "simple" (one message at a time)
+NEWS_WORKER_MODE = os.getenv("NEWS_WORKER_MODE", "batch")
+NEWS_PREFETCH = int(os.getenv("NEWS_PREFETCH", "256"))  # Unacked messages in flight
+NEWS_FETCH_WORKERS = int(os.getenv("NEWS_FETCH_WORKERS", "64"))  # Concurrent HTTP fetches
+NEWS_PER_HOST_LIMIT = int(os.getenv("NEWS_PER_HOST_LIMIT", "8"))  # Concurrent fetches per host
+NEWS_FETCH_TIMEOUT = float(os.getenv("NEWS_FETCH_TIMEOUT", "10"))
+NEWS_BATCH_SIZE = int(os.getenv("NEWS_BATCH_SIZE", "100"))  # Rows per insert
+NEWS_BATCH_SECONDS = float(os.getenv("NEWS_BATCH_SECONDS", "1.0"))  # Max wait before a partial batch is written
+NEWS_MAX_TITLE_BYTES = 256 * 1024  # Give up looking for <title> after this much of the body
+NEWS_DRAIN_BYTES = 64 * 1024  # Read the rest of a small body so its connection can be reused
+
+# Dedup: URLs processed within NEWS_SEEN_TTL are acked without fetching
+REDIS_HOST = os.getenv("REDIS_HOST", "tradeshift_redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+NEWS_SEEN_TTL = int(os.getenv("NEWS_SEEN_TTL", str(7 * 24 * 3600)))
+NEWS_CLAIM_TTL = int(os.getenv("NEWS_CLAIM_TTL", "120"))  # Claim held while a URL is in flight
+NEWS_REDIS_RETRY_SECONDS = 30.0  # Back-off after Redis errors
+NEWS_SCORE_CACHE_SIZE = int(os.getenv("NEWS_SCORE_CACHE_SIZE", "100000"))
+SEEN_KEY_PREFIX = "news:seen:"
+
+TITLE_PATTERN = re.compile(rb"<title[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+# <meta charset="..."> and <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET_PATTERN = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+NO_TITLE = "No title found"
+
 # Initialize VADER Analyzer
 analyzer = SentimentIntensityAnalyzer()
 
-# Database Setup
-DATABASE_URL = "postgresql://user:password@db:5432/tradeshift"
-engine = create_engine(DATABASE_URL)
+# Database Setup (shared pool settings; the worker only needs a small pool)
+engine = create_db_engine(pool_size=2, max_overflow=2)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -26,20 +67,125 @@ class NewsEvent(Base):
     headline = Column(String, index=True)
     sentiment_score = Column(Float)
     url = Column(String)
+    url_hash = Column(String(64), unique=True, index=True)  # Unique index ix_news_events_url_hash
+    symbol = Column(String(50), index=True)  # None for market-wide news
     created_at = Column(DateTime, default=datetime.utcnow)
 
 # Create tables (if they don't exist)
 try:
     Base.metadata.create_all(bind=engine)
+    # Tables created before url_hash existed get the column and its unique index
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE news_events ADD COLUMN IF NOT EXISTS url_hash VARCHAR(64)"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_news_events_url_hash ON news_events (url_hash)"))
+        conn.execute(text("ALTER TABLE news_events ADD COLUMN IF NOT EXISTS symbol VARCHAR(50)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_news_events_symbol ON news_events (symbol)"))
     print("✅ Database tables checked/created.")
 except Exception as e:
     print(f"⚠️ Database connection warning: {e}")
 
+# =========================
+# Dedup and caching
+# =========================
+
+def canonical_url(url):
+    """
+    URL without its fragment, with lower-case scheme and host.
+    """
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+def url_hash(url):
+    return hashlib.sha256(canonical_url(url).encode()).hexdigest()
+
+
+class SeenSet:
+    """
+    Redis-backed set of recently processed URL hashes, with a TTL.
+
+    claim() atomically marks a URL as in flight (SET NX with NEWS_CLAIM_TTL),
+    so duplicate messages cost one Redis round-trip; confirm() extends the
+    mark to NEWS_SEEN_TTL once the row is committed and release() drops it
+    so a failed URL can be retried. If Redis is unreachable every URL is
+    processed (the database upsert still keeps rows unique).
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or Redis(
+            host=REDIS_HOST, port=REDIS_PORT, socket_connect_timeout=1, socket_timeout=1
+        )
+        self.available = True
+        self.retry_at = 0.0
+
+    def claim(self, digest):
+        if not self.available and time.monotonic() < self.retry_at:
+            return True
+        try:
+            claimed = bool(self.redis.set(SEEN_KEY_PREFIX + digest, 1, nx=True, ex=NEWS_CLAIM_TTL))
+        except Exception as e:
+            return self._unavailable(e)
+        self.available = True
+        return claimed
+
+    def confirm(self, digests):
+        self._call(lambda pipe: [pipe.set(SEEN_KEY_PREFIX + d, 1, ex=NEWS_SEEN_TTL) for d in digests])
+
+    def release(self, digests):
+        self._call(lambda pipe: [pipe.delete(SEEN_KEY_PREFIX + d) for d in digests])
+
+    def _call(self, fill):
+        if not self.available and time.monotonic() < self.retry_at:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            fill(pipe)
+            pipe.execute()
+        except Exception as e:
+            self._unavailable(e)
+
+    def _unavailable(self, error):
+        if self.available:
+            print(f"⚠️ Redis seen-set unavailable, processing without dedup: {error}")
+        self.available = False
+        self.retry_at = time.monotonic() + NEWS_REDIS_RETRY_SECONDS
+        return True
+
+
+seen_urls = SeenSet()
+
+
+@lru_cache(maxsize=NEWS_SCORE_CACHE_SIZE)
+def score_headline(title):
+    """
+    VADER compound score, memoized per headline.
+    """
+    return analyzer.polarity_scores(title)["compound"]
+
+
+def upsert_news(db, rows):
+    """
+    Insert rows, updating the existing row for a URL hash already stored.
+    """
+    # One row per hash: ON CONFLICT cannot touch the same row twice in a statement
+    rows = list({row["url_hash"]: row for row in rows}.values())
+    statement = insert(NewsEvent).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[NewsEvent.url_hash],
+        set_={
+            "headline": statement.excluded.headline,
+            "sentiment_score": statement.excluded.sentiment_score,
+            # A re-sent URL without a symbol keeps the one already stored
+            "symbol": func.coalesce(statement.excluded.symbol, NewsEvent.symbol),
+        },
+    ))
+
 def callback(ch, method, properties, body):
     """
     Callback function executed when a message is received from RabbitMQ.
     """
     db = SessionLocal()
+    digest = None
     try:
         # Parse the JSON message
         message = json.loads(body)
@@ -50,6 +196,12 @@ def callback(ch, method, properties, body):
             ch.basic_ack(delivery_tag=method.delivery_tag)
             return
         
+        digest = url_hash(url)
+        if not seen_urls.claim(digest):
+            print(f"⏭️ Already processed: {url}")
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+
         print(f"📰 Processing URL: {url}")
         
         # Fetch the URL content
@@ -64,16 +216,19 @@ def callback(ch, method, properties, body):
         title = title_tag.get_text(strip=True) if title_tag else "No title found"
         
         # Calculate Sentiment
-        sentiment_score = analyzer.polarity_scores(title)['compound']
+        sentiment_score = score_headline(title)
         
-        # Save to Database
-        news_event = NewsEvent(
-            headline=title,
-            sentiment_score=sentiment_score,
-            url=url
-        )
-        db.add(news_event)
+        # Save to Database (idempotent on the URL hash)
+        upsert_news(db, [{
+            "headline": title,
+            "sentiment_score": sentiment_score,
+            "url": url,
+            "url_hash": digest,
+            "symbol": message.get("symbol"),
+            "created_at": datetime.utcnow(),
+        }])
         db.commit()
+        seen_urls.confirm([digest])
         
         # Print confirmation
         print(f"✅ Saved: {title} (Score: {sentiment_score:.2f})")
@@ -83,11 +238,219 @@ def callback(ch, method, properties, body):
         
     except Exception as e:
         print(f"❌ Error processing message: {e}")
+        if digest:
+            seen_urls.release([digest])
         ch.basic_ack(delivery_tag=method.delivery_tag)
     finally:
         db.close()
 
 
+# =========================
+# High-throughput mode
+# =========================
+
+_http = threading.local()
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+
+def _http_session():
+    """
+    This thread's requests.Session (keep-alive connections reused per host).
+    """
+    session = getattr(_http, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=NEWS_PER_HOST_LIMIT)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _http.session = session
+    return session
+
+
+def _host_limit(url):
+    host = urlsplit(url).netloc.lower()
+    with _host_limits_lock:
+        return _host_limits.setdefault(host, threading.BoundedSemaphore(NEWS_PER_HOST_LIMIT))
+
+
+def fetch_title(url):
+    """
+    Stream a page only until its <title> has been read.
+
+    Returns:
+        The page title, or NO_TITLE if none appears in the first
+        NEWS_MAX_TITLE_BYTES of the body
+
+    Raises:
+        requests.RequestException: On connection errors and HTTP error statuses
+    """
+    with _host_limit(url):
+        response = _http_session().get(url, timeout=NEWS_FETCH_TIMEOUT, stream=True)
+        try:
+            response.raise_for_status()
+            head = b""
+            match = None
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                # Re-scan only the tail that could hold a tag split across chunks
+                start = max(0, len(head) - 1024)
+                head += chunk
+                match = TITLE_PATTERN.search(head, start)
+                if match or len(head) >= NEWS_MAX_TITLE_BYTES:
+                    break
+
+            # Reading a short remainder keeps the connection reusable; otherwise drop it
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) - len(head) <= NEWS_DRAIN_BYTES:
+                for _ in response.iter_content(chunk_size=16 * 1024):
+                    pass
+        finally:
+            response.close()
+
+    if not match:
+        return NO_TITLE
+    title = decode_title(match.group(1), head, response.headers.get("Content-Type", ""))
+    return " ".join(html.unescape(title).split()) or NO_TITLE
+
+
+def decode_title(raw, head, content_type):
+    """
+    Decode title bytes with the page's declared charset.
+
+    The Content-Type charset wins, then a <meta> charset in the head. With
+    neither, UTF-8 is tried before cp1252 (requests would assume ISO-8859-1,
+    which garbles UTF-8 titles).
+    """
+    declared = re.search(r"charset\s*=\s*[\"']?([\w.:-]+)", content_type, re.IGNORECASE)
+    meta = META_CHARSET_PATTERN.search(head)
+    candidates = [declared.group(1) if declared else None, meta.group(1).decode("ascii") if meta else None]
+    for encoding in candidates:
+        if encoding:
+            try:
+                return raw.decode(encoding, errors="replace")
+            except LookupError:
+                continue  # Unknown charset name
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("cp1252", errors="replace")
+
+
+class BatchConsumer:
+    """
+    Consumes news messages concurrently and writes them in batches.
+
+    Messages are fetched on a thread pool (up to NEWS_PREFETCH in flight),
+    results are collected on the connection's thread and inserted into
+    news_events in bulk; each message is acked only after its batch commits
+    (or nacked for redelivery if the commit fails).
+    """
+
+    def __init__(self, connection, channel, queue_name):
+        self.connection = connection
+        self.channel = channel
+        self.queue_name = queue_name
+        self.pool = ThreadPoolExecutor(max_workers=NEWS_FETCH_WORKERS, thread_name_prefix="news-fetch")
+        self.results = queue.Queue()
+        self.batch = []  # (delivery_tag, row)
+        self.batch_started = None
+        self.processed = 0
+        self.duplicates = 0
+        self.started = time.monotonic()
+
+    def on_message(self, ch, method, properties, body):
+        try:
+            message = json.loads(body)
+            url, symbol = message.get("url"), message.get("symbol")
+        except (ValueError, AttributeError):
+            url = symbol = None
+        if not url:
+            print("❌ Error: No URL provided in message")
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+        digest = url_hash(url)
+        if not seen_urls.claim(digest):
+            # Duplicate: one Redis lookup, no fetch, no write
+            self.duplicates += 1
+            ch.basic_ack(delivery_tag=method.delivery_tag)
+            return
+        self.pool.submit(self._fetch, method.delivery_tag, url, digest, symbol)
+
+    def _fetch(self, delivery_tag, url, digest, symbol):
+        # Runs on the fetch pool; pika calls stay on the connection thread
+        try:
+            self.results.put((delivery_tag, url, digest, symbol, fetch_title(url), None))
+        except Exception as e:
+            self.results.put((delivery_tag, url, digest, symbol, None, e))
+
+    def _collect(self):
+        while True:
+            try:
+                delivery_tag, url, digest, symbol, title, error = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if error is not None:
+                # Same policy as the simple mode: a failed URL is dropped (and may be queued again)
+                print(f"❌ Error fetching {url}: {error}")
+                seen_urls.release([digest])
+                self.channel.basic_ack(delivery_tag=delivery_tag)
+                continue
+            sentiment_score = score_headline(title)
+            if not self.batch:
+                self.batch_started = time.monotonic()
+            self.batch.append((delivery_tag, {
+                "headline": title,
+                "sentiment_score": sentiment_score,
+                "url": url,
+                "url_hash": digest,
+                "symbol": symbol,
+                "created_at": datetime.utcnow(),
+            }))
+
+    def flush(self):
+        """
+        Insert the pending rows in one transaction, then ack their messages.
+        """
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        db = SessionLocal()
+        try:
+            upsert_news(db, [row for _, row in batch])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Batch insert failed ({len(batch)} rows), requeueing: {e}")
+            seen_urls.release([row["url_hash"] for _, row in batch])
+            for delivery_tag, _ in batch:
+                self.channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+            return
+        finally:
+            db.close()
+
+        seen_urls.confirm([row["url_hash"] for _, row in batch])
+        for delivery_tag, _ in batch:
+            self.channel.basic_ack(delivery_tag=delivery_tag)
+        self.processed += len(batch)
+        rate = self.processed / max(time.monotonic() - self.started, 1e-9)
+        print(f"✅ Saved {len(batch)} headlines ({self.processed} total, {rate:.0f}/s, "
+              f"{self.duplicates} duplicates skipped)")
+
+    def run(self):
+        self.channel.basic_qos(prefetch_count=NEWS_PREFETCH)
+        self.channel.basic_consume(queue=self.queue_name, on_message_callback=self.on_message, auto_ack=False)
+        try:
+            while True:
+                self.connection.process_data_events(time_limit=0.05)
+                self._collect()
+                if len(self.batch) >= NEWS_BATCH_SIZE or (
+                    self.batch and time.monotonic() - self.batch_started >= NEWS_BATCH_SECONDS
+                ):
+                    self.flush()
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
 def main():
     """
     Main function to establish RabbitMQ connection and start consuming messages.
@@ -115,17 +478,23 @@ def main():
             print(f"✅ Connected to RabbitMQ")
             print(f"👂 Listening on queue: {queue_name}")
             
-            # Set up consumer
-            channel.basic_consume(
-                queue=queue_name,
-                on_message_callback=callback,
-                auto_ack=False  # Manual acknowledgment
-            )
-            
-            print("⏳ Waiting for messages. Press CTRL+C to exit.")
-            
-            # Start consuming
-            channel.start_consuming()
+            if NEWS_WORKER_MODE == "batch":
+                print(f"⚡ Batch mode: prefetch {NEWS_PREFETCH}, {NEWS_FETCH_WORKERS} fetchers, "
+                      f"batches of {NEWS_BATCH_SIZE}")
+                print("⏳ Waiting for messages. Press CTRL+C to exit.")
+                BatchConsumer(connection, channel, queue_name).run()
+            else:
+                # Set up consumer
+                channel.basic_consume(
+                    queue=queue_name,
+                    on_message_callback=callback,
+                    auto_ack=False  # Manual acknowledgment
+                )
+
+                print("⏳ Waiting for messages. Press CTRL+C to exit.")
+
+                # Start consuming
+                channel.start_consuming()
             
         except pika.exceptions.AMQPConnectionError as e:
             print(f"⚠️ Connection failed: {e}")